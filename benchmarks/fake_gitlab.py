@@ -0,0 +1,397 @@
+"""
+Faux serveur GraphQL GitLab pour mesurer l'API sans instance GitLab.
+
+Il répond aux requêtes envoyées par ``kpi_api`` (reconnues par leur nom d'opération) :
+
+- ``issueStore`` : issues d'un groupe filtrées par createdAfter/createdBefore/updatedAfter,
+  avec labels, assignees et première page de timelogs ;
+- ``oldestIssue`` : date de création de la plus ancienne issue ;
+- ``groupTimelogs`` : timelogs d'un groupe filtrés par startTime/endTime, avec leur issue
+  (labels, discussions) si la requête la demande ;
+- ``nestedOverflow`` : pages suivantes des timelogs de plusieurs issues (alias i0, i1...) ;
+- ``parentIssues`` : issues de plusieurs projets par iid (alias p0, p1...).
+
+Chaque groupe demandé est généré à la volée (aléatoire reproductible, graine dérivée du
+chemin du groupe) : ``--issues`` issues sur ``--days`` jours, en moyenne ``--timelogs``
+timelogs par issue, dont quelques issues avec plus de 100 timelogs pour exercer la
+pagination imbriquée. Chaque requête attend ``--latency`` secondes (± ``--jitter``), comme
+une page servie par GitLab. ``GET /stats`` renvoie le nombre de requêtes reçues par
+opération.
+
+Utilisation :
+    python benchmarks/fake_gitlab.py --port 8011 --issues 2000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import base64
+import bisect
+import json
+import random
+import re
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+PAGE_SIZE = 100
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+LABELS_ANOMALIE = ["Anomalie::Bloquante", "Anomalie::Majeure", "Anomalie::Mineure"]
+LABELS_NC = ["Non-conformité::Majeure", "Non-conformité::Mineure"]
+LABELS_ETAT = ["Etat::À faire", "Etat::En cours", "Etat::À vérifier"]
+
+
+def _time(value: datetime) -> str:
+    return value.strftime(TIME_FORMAT)
+
+
+def _parse(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _cursor(offset: int) -> str:
+    return base64.b64encode(f"offset:{offset}".encode()).decode()
+
+
+def _offset(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(":", 1)[1])
+
+
+def _page(items: list, cursor: str | None, render) -> dict:
+    """
+    Page de ``PAGE_SIZE`` éléments à partir du curseur, ``pageInfo`` en dernier comme
+    dans les réponses de GitLab.
+    """
+    start = _offset(cursor)
+    end = start + PAGE_SIZE
+    has_next = end < len(items)
+    return {
+        "nodes": [render(item) for item in items[start:end]],
+        "pageInfo": {
+            "hasNextPage": has_next,
+            "endCursor": _cursor(end) if has_next else None,
+        },
+    }
+
+
+class FakeGroup:
+    """
+    Issues et timelogs synthétiques d'un groupe.
+    """
+
+    def __init__(self, path: str, args: argparse.Namespace, now: datetime):
+        rng = random.Random(zlib.crc32(path.encode()) ^ args.seed)
+        users = [f"Utilisateur {i}" for i in range(args.users)]
+        history = timedelta(days=args.days)
+
+        self.issues = []
+        self.timelogs = []
+        self.by_id = {}
+        parents_by_project = {}
+        for number in range(args.issues):
+            created = now - history * rng.random()
+            closed = None
+            if rng.random() < args.closed_ratio:
+                closed = min(created + timedelta(days=rng.expovariate(1 / 10)), now)
+            project_id = rng.randint(1, args.projects)
+            kind = "TASK" if rng.random() < 0.3 else "ISSUE"
+            iid = str(number + 1)
+
+            labels = [f"WP::{rng.randint(1, 8)}"]
+            if closed is None and rng.random() < 0.8:
+                labels.append(rng.choice(LABELS_ETAT))
+            if rng.random() < 0.5:
+                labels.append(f"Priorité::{rng.randint(1, 4)}")
+            if rng.random() < 0.1:
+                labels.append(rng.choice(LABELS_ANOMALIE))
+            if rng.random() < 0.05:
+                labels.append(rng.choice(LABELS_NC))
+
+            first_note = "created issue"
+            parents = parents_by_project.setdefault(project_id, [])
+            if kind == "TASK" and parents:
+                first_note = f"added #{rng.choice(parents)} as parent issue"
+            elif kind == "ISSUE":
+                parents.append(iid)
+
+            # Quelques issues dépassent une page de timelogs (pagination imbriquée)
+            if rng.random() < args.heavy_ratio:
+                count = rng.randint(PAGE_SIZE + 1, 3 * PAGE_SIZE)
+            else:
+                count = rng.randint(0, 2 * args.timelogs)
+            end = closed or now
+            timelogs = [
+                {
+                    "id": f"gid://gitlab/Timelog/{len(self.timelogs) + k + 1}",
+                    "timeSpent": rng.choice((900, 1800, 3600, 7200)),
+                    "spentAt": created + (end - created) * rng.random(),
+                    "user": {"name": rng.choice(users)},
+                }
+                for k in range(count)
+            ]
+            timelogs.sort(key=lambda timelog: timelog["spentAt"])
+
+            issue = {
+                "id": f"gid://gitlab/Issue/{number + 1}",
+                "iid": iid,
+                "title": f"Issue {iid}",
+                "type": kind,
+                "state": "closed" if closed else "opened",
+                "projectId": project_id,
+                "createdAt": created,
+                "updatedAt": max([created, end] + [t["spentAt"] for t in timelogs]),
+                "closedAt": closed,
+                "dueDate": (
+                    (created + timedelta(days=rng.randint(1, 30))).date().isoformat()
+                    if rng.random() < 0.7
+                    else None
+                ),
+                "timeEstimate": rng.randint(0, 16) * 1800,
+                "labels": labels,
+                "assignees": rng.sample(users, k=min(len(users), rng.randint(0, 2))),
+                "timelogs": timelogs,
+                "firstNote": first_note,
+            }
+            for timelog in timelogs:
+                timelog["issue"] = issue
+            self.issues.append(issue)
+            self.timelogs.extend(timelogs)
+            self.by_id[issue["id"]] = issue
+
+        self.issues.sort(key=lambda issue: issue["createdAt"])
+        self.created = [issue["createdAt"] for issue in self.issues]
+        self.timelogs.sort(key=lambda timelog: timelog["spentAt"])
+        self.spent = [timelog["spentAt"] for timelog in self.timelogs]
+
+    def issues_between(self, after: datetime | None, before: datetime | None) -> list:
+        start = bisect.bisect_left(self.created, after) if after else 0
+        end = bisect.bisect_right(self.created, before) if before else len(self.issues)
+        return self.issues[start:end]
+
+    def timelogs_between(self, after: datetime | None, before: datetime | None) -> list:
+        start = bisect.bisect_left(self.spent, after) if after else 0
+        end = bisect.bisect_right(self.spent, before) if before else len(self.spent)
+        return self.timelogs[start:end]
+
+
+def _render_timelog(timelog: dict) -> dict:
+    return {
+        "timeSpent": timelog["timeSpent"],
+        "spentAt": _time(timelog["spentAt"]),
+        "user": timelog["user"],
+    }
+
+
+def _render_labels(issue: dict) -> dict:
+    return {"nodes": [{"title": title} for title in issue["labels"]]}
+
+
+def _render_store_issue(issue: dict) -> dict:
+    return {
+        "id": issue["id"],
+        "iid": issue["iid"],
+        "title": issue["title"],
+        "type": issue["type"],
+        "state": issue["state"],
+        "projectId": issue["projectId"],
+        "createdAt": _time(issue["createdAt"]),
+        "updatedAt": _time(issue["updatedAt"]),
+        "closedAt": _time(issue["closedAt"]) if issue["closedAt"] else None,
+        "dueDate": issue["dueDate"],
+        "timeEstimate": issue["timeEstimate"],
+        "labels": _render_labels(issue),
+        "assignees": {"nodes": [{"name": name} for name in issue["assignees"]]},
+        "timelogs": _page(issue["timelogs"], None, _render_timelog),
+    }
+
+
+def _render_timelog_issue(issue: dict) -> dict:
+    return {
+        "id": issue["id"],
+        "iid": issue["iid"],
+        "title": issue["title"],
+        "type": issue["type"],
+        "projectId": issue["projectId"],
+        "timeEstimate": issue["timeEstimate"],
+        "totalTimeSpent": sum(t["timeSpent"] for t in issue["timelogs"]),
+        "labels": _render_labels(issue),
+        "discussions": {
+            "nodes": [{"notes": {"nodes": [{"body": issue["firstNote"]}]}}]
+        },
+    }
+
+
+def _aliases(variables: dict, prefix: str) -> int:
+    count = 0
+    while f"{prefix}{count}" in variables:
+        count += 1
+    return count
+
+
+class FakeGitLab:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.groups: dict[str, FakeGroup] = {}
+        self.stats = Counter()
+        self.bytes = 0
+
+    def group(self, path: str) -> FakeGroup:
+        if path not in self.groups:
+            self.groups[path] = FakeGroup(path, self.args, self.now)
+        return self.groups[path]
+
+    def _issue_store(self, query: str, variables: dict) -> dict:
+        group = self.group(variables["groupPath"])
+        issues = group.issues_between(
+            _parse(variables.get("createdAfter")),
+            _parse(variables.get("createdBefore")),
+        )
+        updated_after = _parse(variables.get("updatedAfter"))
+        if updated_after:
+            issues = [issue for issue in issues if issue["updatedAt"] >= updated_after]
+        page = _page(issues, variables.get("after"), _render_store_issue)
+        return {"group": {"issues": page}}
+
+    def _oldest_issue(self, query: str, variables: dict) -> dict:
+        group = self.group(variables["groupPath"])
+        if not group.issues:
+            return {"group": {"issues": {"nodes": []}}}
+        nodes = [{"createdAt": _time(group.issues[0]["createdAt"])}]
+        return {"group": {"issues": {"nodes": nodes}}}
+
+    def _group_timelogs(self, query: str, variables: dict) -> dict:
+        group = self.group(variables["groupPath"])
+        timelogs = group.timelogs_between(
+            _parse(variables.get("startTime")), _parse(variables.get("endTime"))
+        )
+        with_issue = re.search(r"\bissue\s*\{", query) is not None
+
+        def render(timelog: dict) -> dict:
+            node = {
+                "id": timelog["id"],
+                "timeSpent": timelog["timeSpent"],
+                "user": timelog["user"],
+            }
+            if with_issue:
+                node["issue"] = _render_timelog_issue(timelog["issue"])
+            return node
+
+        page = _page(timelogs, variables.get("after"), render)
+        return {"group": {"timelogs": page}}
+
+    def _nested_overflow(self, query: str, variables: dict) -> dict:
+        data = {}
+        for i in range(_aliases(variables, "id")):
+            issue = None
+            for group in self.groups.values():
+                issue = group.by_id.get(variables[f"id{i}"])
+                if issue is not None:
+                    break
+            if issue is None:
+                data[f"i{i}"] = None
+                continue
+            page = _page(issue["timelogs"], variables.get(f"after{i}"), _render_timelog)
+            data[f"i{i}"] = {"timelogs": page}
+        return data
+
+    def _parent_issues(self, query: str, variables: dict) -> dict:
+        data = {}
+        for i in range(_aliases(variables, "project")):
+            project_ids = {
+                int(gid.rsplit("/", 1)[1]) for gid in variables[f"project{i}"]
+            }
+            iids = set(variables.get(f"iids{i}") or [])
+            nodes = [
+                {
+                    "iid": issue["iid"],
+                    "title": issue["title"],
+                    "labels": _render_labels(issue),
+                }
+                for group in self.groups.values()
+                for issue in group.issues
+                if issue["projectId"] in project_ids and issue["iid"] in iids
+            ]
+            data[f"p{i}"] = {"nodes": [{"issues": {"nodes": nodes}}]}
+        return data
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        match = re.search(r"query\s+(\w+)", query)
+        operation = match.group(1) if match else "anonymous"
+        self.stats[operation] += 1
+
+        await asyncio.sleep(
+            max(self.args.latency + random.uniform(-1, 1) * self.args.jitter, 0)
+        )
+
+        handler = {
+            "issueStore": self._issue_store,
+            "oldestIssue": self._oldest_issue,
+            "groupTimelogs": self._group_timelogs,
+            "nestedOverflow": self._nested_overflow,
+            "parentIssues": self._parent_issues,
+        }.get(operation)
+        if handler is None:
+            body = {"errors": [{"message": f"Opération inconnue : {operation}"}]}
+        else:
+            body = {"data": handler(query, variables)}
+
+        raw = json.dumps(body).encode("utf-8")
+        self.bytes += len(raw)
+        return web.Response(body=raw, content_type="application/json")
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": sum(self.stats.values()),
+                "bytes": self.bytes,
+                "by_operation": dict(self.stats),
+            }
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--issues", type=int, default=2000, help="Issues par groupe")
+    parser.add_argument("--timelogs", type=int, default=3, help="Timelogs par issue")
+    parser.add_argument(
+        "--heavy-ratio",
+        type=float,
+        default=0.01,
+        help="Part des issues avec plus de 100 timelogs",
+    )
+    parser.add_argument("--days", type=int, default=365, help="Profondeur d'historique")
+    parser.add_argument("--users", type=int, default=12)
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--closed-ratio", type=float, default=0.6)
+    parser.add_argument("--latency", type=float, default=0.05, help="Secondes/page")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    fake = FakeGitLab(args)
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/api/graphql", fake.graphql)
+    app.router.add_get("/stats", fake.get_stats)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Mesure des endpoints ``/metrics/*`` contre le faux serveur GitLab (``fake_gitlab.py``).
+
+Le script lance le faux serveur GitLab et l'API (uvicorn) dans des sous-processus, fait
+un premier appel qui remplit le stockage local des issues, puis envoie ``--requests``
+requêtes à chaque endpoint et affiche la latence (p50/p95/p99) et le nombre de requêtes
+reçues par le faux GitLab.
+
+Par défaut, chaque requête décale ``created_before`` d'une seconde, comme les dates exactes
+envoyées par Grafana : le cache des réponses ne sert pas et on mesure le calcul à partir du
+stockage local. Avec ``--cached``, les paramètres sont identiques d'une requête à l'autre.
+
+Utilisation :
+    python benchmarks/run.py --issues 5000 --latency 0.05 --requests 50 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+GROUP_PATH = "bench/groupe"
+
+# Endpoint -> paramètres de date attendus (en plus de group_path)
+ENDPOINTS = {
+    "/metrics/time_spent": ("created_after",),
+    "/metrics/opened_closed_issues": ("created_after", "created_before"),
+    "/metrics/burndown": ("created_after", "created_before"),
+    "/metrics/burnup": ("created_after", "created_before"),
+    "/metrics/priority_burndown": ("created_after", "created_before"),
+    "/metrics/resolve_time": ("created_after", "created_before"),
+    "/metrics/resolve_time_mean": ("created_after", "created_before"),
+    "/metrics/time_per_wp": ("created_after",),
+    "/metrics/summary": ("created_after", "created_before"),
+    "/metrics/issues_count_by_user": ("created_after", "created_before"),
+    "/metrics/anomalies_nc": ("created_after", "created_before"),
+    "/metrics/batch": ("created_after", "created_before"),
+}
+BATCH_METRICS = "burndown,burnup,priority_burndown,resolve_time,summary,anomalies_nc"
+
+
+def _time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+async def _wait_ready(session: aiohttp.ClientSession, url: str, process) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le processus servant {url} s'est arrêté")
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} ne répond pas")
+
+
+async def _upstream_requests(session: aiohttp.ClientSession, fake_url: str) -> int:
+    async with session.get(f"{fake_url}/stats") as response:
+        return (await response.json())["requests"]
+
+
+def _params(endpoint: str, start: datetime, end: datetime, shift: int) -> dict:
+    params = {"group_path": GROUP_PATH}
+    names = ENDPOINTS[endpoint]
+    # Sans date de fin, c'est la date de début qui varie d'une requête à l'autre
+    if "created_before" in names:
+        end += timedelta(seconds=shift)
+    else:
+        start -= timedelta(seconds=shift)
+    params["created_after"] = _time(start)
+    if "created_before" in names:
+        params["created_before"] = _time(end)
+    if endpoint == "/metrics/batch":
+        params["metrics"] = BATCH_METRICS
+    return params
+
+
+async def _call(session: aiohttp.ClientSession, url: str, params: dict) -> float:
+    started = time.perf_counter()
+    async with session.get(url, params=params) as response:
+        await response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{url} : HTTP {response.status}")
+    return time.perf_counter() - started
+
+
+async def bench_endpoint(
+    session: aiohttp.ClientSession, args: argparse.Namespace, endpoint: str, window
+) -> dict:
+    """
+    Envoie ``args.requests`` requêtes à un endpoint, au plus ``args.concurrency`` à la fois.
+
+    :return: Latences (secondes) et requêtes reçues par le faux GitLab.
+    """
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> float:
+        params = _params(endpoint, *window, 0 if args.cached else i + 1)
+        async with semaphore:
+            return await _call(session, api_url + endpoint, params)
+
+    before = await _upstream_requests(session, fake_url)
+    latencies = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    upstream = await _upstream_requests(session, fake_url) - before
+    return {"latencies": latencies, "upstream": upstream}
+
+
+def _summary(endpoint: str, latencies: list, upstream: int) -> dict:
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        "endpoint": endpoint,
+        "requests": len(latencies),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "upstream_requests": upstream,
+    }
+
+
+def _print_table(rows: list) -> None:
+    print(
+        f"{'endpoint':<34}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'GitLab':>8}"
+    )
+    for row in rows:
+        print(
+            f"{row['endpoint']:<34}{row['requests']:>5}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            f"{row['upstream_requests']:>8}"
+        )
+
+
+async def run(args: argparse.Namespace) -> list:
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT / "src"),
+        "GITLAB_URL": f"{fake_url}/api/graphql",
+        "ACCESS_TOKEN": "benchmark",
+        "PREWARM_TARGETS": "[]",
+        "PYTHONWARNINGS": "ignore",
+    }
+    fake_command = [
+        sys.executable,
+        str(ROOT / "benchmarks" / "fake_gitlab.py"),
+        f"--port={args.fake_port}",
+        f"--issues={args.issues}",
+        f"--timelogs={args.timelogs}",
+        f"--days={args.days}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+    ]
+    api_command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "kpi_api.main:app",
+        f"--port={args.api_port}",
+        "--log-level=warning",
+    ]
+    processes = [
+        subprocess.Popen(fake_command),
+        subprocess.Popen(api_command, env=env),
+    ]
+    try:
+        timeout = aiohttp.ClientTimeout(total=600)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            await _wait_ready(session, f"{fake_url}/stats", processes[0])
+            await _wait_ready(session, f"{api_url}/", processes[1])
+
+            # Fenêtre des ``--window`` derniers jours de l'historique synthétique
+            end = datetime.now(timezone.utc).replace(microsecond=0)
+            window = (end - timedelta(days=args.window), end)
+
+            # Premier appel : synchronisation complète du stockage local des issues
+            before = await _upstream_requests(session, fake_url)
+            cold = await _call(
+                session,
+                f"{api_url}/metrics/summary",
+                _params("/metrics/summary", *window, 0),
+            )
+            upstream = await _upstream_requests(session, fake_url) - before
+            rows = [_summary("premier appel (synchro)", [cold], upstream)]
+
+            for endpoint in args.endpoints or ENDPOINTS:
+                result = await bench_endpoint(session, args, endpoint, window)
+                rows.append(_summary(endpoint, result["latencies"], result["upstream"]))
+            return rows
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--issues", type=int, default=2000, help="Issues du groupe")
+    parser.add_argument("--timelogs", type=int, default=3, help="Timelogs par issue")
+    parser.add_argument("--days", type=int, default=365, help="Profondeur d'historique")
+    parser.add_argument("--window", type=int, default=90, help="Fenêtre (jours)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Secondes/page")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--requests", type=int, default=20, help="Par endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--cached", action="store_true", help="Mêmes paramètres à chaque requête"
+    )
+    parser.add_argument(
+        "--endpoint",
+        dest="endpoints",
+        action="append",
+        choices=list(ENDPOINTS),
+        help="Endpoint à mesurer (répétable, tous par défaut)",
+    )
+    parser.add_argument("--fake-port", type=int, default=8011)
+    parser.add_argument("--api-port", type=int, default=8010)
+    parser.add_argument("--json", help="Fichier où écrire les résultats en JSON")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    _print_table(rows)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Mesure le temps de sérialisation et de transfert des plus grosses réponses de l'API,
+avant (``jsonable_encoder`` + ``JSONResponse``, sans compression) et après
+(``kpi_api.utils.responses.dumps`` + compression gzip/brotli).
+
+Les réponses sont générées avec la forme de celles de l'API (``/metrics/resolve_time``,
+``/gitlab/crah``, ``/metrics/burndown`` sur plusieurs années) ; le transfert est estimé
+à partir du débit donné.
+
+Utilisation :
+    PYTHONPATH=src python benchmarks/serialization.py [--issues 50000] [--mbps 20]
+"""
+
+import argparse
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from kpi_api.utils.compression import brotli, compress
+from kpi_api.utils.responses import dumps, orjson
+
+
+def resolve_time_payload(issues: int) -> list:
+    return [{"time": random.uniform(0.01, 120)} for _ in range(issues)]
+
+
+def _duration() -> str:
+    return f"{random.randint(0, 40)}h{random.randint(0, 59):02d}min"
+
+
+def crah_payload(issues: int) -> dict:
+    users = [f"Utilisateur {i}" for i in range(20)]
+    return {
+        user: [
+            {
+                "iid": f"{random.randint(1, 500)}#{random.randint(1, 5000)}",
+                "nom issue": f"Issue parente {i} : tâche {random.randint(1, 10**6)}",
+                "WP": f"WP{random.randint(1, 12)}",
+                "temps passé total": _duration(),
+                "temps restant estimé": _duration(),
+            }
+            for i in range(issues // len(users))
+        ]
+        for user in users
+    }
+
+
+def burndown_payload(days: int) -> list:
+    remaining = days
+    rows = []
+    for i in range(days):
+        done = random.randint(0, 3)
+        remaining = max(remaining + random.randint(0, 3) - done, 0)
+        rows.append(
+            {
+                "day": f"day-{i}",
+                "remaining": remaining,
+                "ideal": days - i * (days / (days - 1)),
+                "done": done,
+            }
+        )
+    return rows
+
+
+def timed(func, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--issues", type=int, default=50000)
+    parser.add_argument("--mbps", type=float, default=20.0, help="Débit du réseau")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    payloads = {
+        "/metrics/resolve_time": resolve_time_payload(args.issues),
+        "/gitlab/crah": crah_payload(args.issues),
+        "/metrics/burndown (5 ans)": burndown_payload(5 * 365),
+    }
+    bytes_per_second = args.mbps * 1_000_000 / 8
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+    print(
+        f"Encodeur : {'orjson' if orjson is not None else 'json'}, "
+        f"compression : {', '.join(encodings)}, débit : {args.mbps} Mbit/s\n"
+    )
+    header = (
+        f"{'réponse':<28}{'variante':<14}{'octets':>12}"
+        f"{'sérial.':>10}{'compr.':>10}{'transfert':>11}{'total':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for name, payload in payloads.items():
+        body, serialize = timed(
+            lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat
+        )
+        transfer = len(body) / bytes_per_second
+        rows = [("avant", len(body), serialize, 0.0, transfer)]
+
+        body, serialize = timed(lambda: dumps(payload), args.repeat)
+        for encoding in encodings:
+            compressed, compression = timed(
+                lambda: compress(body, encoding), args.repeat
+            )
+            transfer = len(compressed) / bytes_per_second
+            rows.append(
+                (f"après {encoding}", len(compressed), serialize, compression, transfer)
+            )
+
+        for variant, size, serialize, compression, transfer in rows:
+            total = serialize + compression + transfer
+            print(
+                f"{name:<28}{variant:<14}{size:>12}{serialize * 1000:>8.1f}ms"
+                f"{compression * 1000:>8.1f}ms{transfer * 1000:>9.1f}ms"
+                f"{total * 1000:>8.1f}ms"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
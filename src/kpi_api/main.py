@@ -2,14 +2,48 @@
 Ce module contient les routes de l'API FastAPI.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 
 import kpi_api.routes.gitlab as gitlab
 import kpi_api.routes.kimai as kimai
 import kpi_api.routes.nextcloud as nextcloud
 from kpi_api.routes.screenshot import screenshot_issue_board
+from kpi_api.utils import gitlab_client, kimai_client, metrics, prewarm, singleflight
+from kpi_api.utils.cache import cached, response_cache
+from kpi_api.utils.compression import CompressionMiddleware
+from kpi_api.utils.config import (
+    CACHE_TTL_CALENDAR,
+    CACHE_TTL_GITLAB,
+    CACHE_TTL_KIMAI,
+    CACHE_TTL_SCREENSHOT,
+)
+from kpi_api.utils.responses import FastJSONResponse
+from kpi_api.utils.singleflight import coalesced
+from kpi_api.utils.timing import ServerTimingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ouvre les sessions HTTP partagées et lance le préchauffage du cache au démarrage,
+    puis les arrête à l'arrêt.
+    """
+    await gitlab_client.open_session()
+    await kimai_client.open_session()
+    prewarm.start_prewarm(app.routes)
+    yield
+    await prewarm.stop_prewarm()
+    await kimai_client.close_session()
+    await gitlab_client.close_session()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.get("/")
@@ -18,26 +52,30 @@ async def root():
 
 
 @app.get("/metrics/time_spent")
+@cached("/metrics/time_spent", CACHE_TTL_GITLAB)
 async def time_spent(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.fetch_time_spent_by_user(group_path, created_after)
+        data = await coalesced(
+            gitlab.fetch_time_spent_by_user, group_path, created_after
+        )
         return {"time_by_user": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/opened_closed_issues")
+@cached("/metrics/opened_closed_issues", CACHE_TTL_GITLAB)
 async def opened_closed_issues(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.fetch_opened_closed_tasks(
-            group_path, created_after, created_before
+        data = await coalesced(
+            gitlab.fetch_opened_closed_tasks, group_path, created_after, created_before
         )
         return {"opened_closed_tasks": data}
     except Exception as e:
@@ -45,57 +83,105 @@ async def opened_closed_issues(
 
 
 @app.get("/metrics/burndown")
+@cached("/metrics/burndown", CACHE_TTL_GITLAB)
 async def burndown(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.burndown_chart(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.burndown_chart, group_path, created_after, created_before
+        )
         return {"burndown": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/resolve_time")
+@cached("/metrics/resolve_time", CACHE_TTL_GITLAB)
 async def resolve_time(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.resolve_time(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.resolve_time, group_path, created_after, created_before
+        )
         return {"resolve_time": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/time_per_wp")
+@cached("/metrics/time_per_wp", CACHE_TTL_GITLAB)
 async def time_per_wp(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.temps_passe_par_wp(group_path, created_after)
+        data = await coalesced(gitlab.temps_passe_par_wp, group_path, created_after)
         return {"time_per_wp": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/resolve_time_mean")
+@cached("/metrics/resolve_time_mean", CACHE_TTL_GITLAB)
 async def resolve_time_mean(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.resolve_time_mean(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.resolve_time_mean, group_path, created_after, created_before
+        )
         return {"resolve_time_mean": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics/batch")
+@cached("/metrics/batch", CACHE_TTL_GITLAB)
+async def metrics_batch(
+    group_path: str = Query(..., description="Path du groupe GitLab"),
+    created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
+    created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
+    metrics: list[str] = Query(
+        ..., description="Noms des métriques (répétés ou séparés par des virgules)"
+    ),
+):
+    """
+    Calcule plusieurs métriques GitLab sur la même fenêtre en une seule requête, à partir
+    d'une seule synchronisation avec GitLab. Le résultat est indexé par nom de métrique.
+    """
+    names = tuple(
+        dict.fromkeys(
+            name.strip()
+            for value in metrics
+            for name in value.split(",")
+            if name.strip()
+        )
+    )
+    unknown = [name for name in names if name not in gitlab.BATCH_METRICS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Métriques inconnues : {', '.join(unknown) or '(aucune demandée)'}"
+            f" ; disponibles : {', '.join(gitlab.BATCH_METRICS)}",
+        )
+    try:
+        return await coalesced(
+            gitlab.fetch_metrics_batch, group_path, created_after, created_before, names
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/kimai/hours")
+@cached("/kimai/hours", CACHE_TTL_KIMAI)
 async def kimai_hours(
     created_after: str = Query(..., example="2023-10-01T00:00:00"),
     created_before: str = Query(..., example="2023-10-31T23:59:59"),
@@ -104,7 +190,7 @@ async def kimai_hours(
 
         clean_from = created_after.replace("Z", "")
         clean_to = created_before.replace("Z", "")
-        data = kimai.get_all_users_hours(clean_from, clean_to)
+        data = await coalesced(kimai.get_all_users_hours, clean_from, clean_to)
         return {"kimai_hours": data}
     except Exception as e:
         print(f"ERREUR FINALE: {str(e)}")
@@ -112,6 +198,7 @@ async def kimai_hours(
 
 
 @app.get("/kimai/detailed_hours")
+@cached("/kimai/detailed_hours", CACHE_TTL_KIMAI)
 async def kimai_hours(
     created_after: str = Query(..., example="2023-10-01T00:00:00"),
     created_before: str = Query(..., example="2023-10-31T23:59:59"),
@@ -120,7 +207,9 @@ async def kimai_hours(
 
         clean_from = created_after.replace("Z", "")
         clean_to = created_before.replace("Z", "")
-        data = kimai.get_all_users_hours_by_activity(clean_from, clean_to)
+        data = await coalesced(
+            kimai.get_all_users_hours_by_activity, clean_from, clean_to
+        )
         return {"kimai_hours": data}
     except Exception as e:
         print(f"ERREUR FINALE: {str(e)}")
@@ -128,6 +217,7 @@ async def kimai_hours(
 
 
 @app.get("/kimai/detailed_hours")
+@cached("/kimai/detailed_hours", CACHE_TTL_KIMAI)
 async def kimai_hours(
     created_after: str = Query(..., example="2023-10-01T00:00:00"),
     created_before: str = Query(..., example="2023-10-31T23:59:59"),
@@ -137,7 +227,9 @@ async def kimai_hours(
 
         clean_from = created_after.replace("Z", "")
         clean_to = created_before.replace("Z", "")
-        data = kimai.get_user_hours_by_activity(clean_from, clean_to, user_id)
+        data = await coalesced(
+            kimai.get_user_hours_by_activity, clean_from, clean_to, user_id
+        )
         return {"kimai_hours": data}
     except Exception as e:
         print(f"ERREUR FINALE: {str(e)}")
@@ -145,45 +237,51 @@ async def kimai_hours(
 
 
 @app.get("/kimai/current_week")
+@cached("/kimai/current_week", CACHE_TTL_KIMAI)
 async def kimai_current_week():
     try:
-        data = kimai.get_all_current_week_hours()
+        data = await coalesced(kimai.get_all_current_week_hours)
         return {"kimai_hours": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/kiami/last_week")
+@cached("/kiami/last_week", CACHE_TTL_KIMAI)
 async def kimai_last_week():
     try:
-        data = kimai.get_all_last_week_hours()
+        data = await coalesced(kimai.get_all_last_week_hours)
         return {"kimai_hours": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/burnup")
+@cached("/metrics/burnup", CACHE_TTL_GITLAB)
 async def burnup(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.fetch_burnup_data(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.fetch_burnup_data, group_path, created_after, created_before
+        )
         return {"burnup": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/summary")
+@cached("/metrics/summary", CACHE_TTL_GITLAB)
 async def summary(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.fetch_issues_summary(
-            group_path, created_after, created_before
+        data = await coalesced(
+            gitlab.fetch_issues_summary, group_path, created_after, created_before
         )
         return {"summary": data}
     except Exception as e:
@@ -191,14 +289,18 @@ async def summary(
 
 
 @app.get("/metrics/issues_count_by_user")
+@cached("/metrics/issues_count_by_user", CACHE_TTL_GITLAB)
 async def issues_count_by_user(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.fetch_open_issues_count_by_user(
-            group_path, created_after, created_before
+        data = await coalesced(
+            gitlab.fetch_open_issues_count_by_user,
+            group_path,
+            created_after,
+            created_before,
         )
         return {"issues_count_by_user": data}
     except Exception as e:
@@ -206,25 +308,29 @@ async def issues_count_by_user(
 
 
 @app.get("/metrics/priority_burndown")
+@cached("/metrics/priority_burndown", CACHE_TTL_GITLAB)
 async def priority_burndown(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        data = await gitlab.priority_burndown_chart(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.priority_burndown_chart, group_path, created_after, created_before
+        )
         return {"priority_burndown": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/gitlab/screenshot")
+@cached("/gitlab/screenshot", CACHE_TTL_SCREENSHOT)
 async def get_screenshot():
     """
     Capture un screenshot d'une URL protégée en utilisant un token d'authentification.
     """
     try:
-        return await screenshot_issue_board()
+        return await coalesced(screenshot_issue_board)
 
     except Exception as e:
         raise HTTPException(
@@ -233,20 +339,22 @@ async def get_screenshot():
 
 
 @app.get("/gitlab/late_summary")
+@cached("/gitlab/late_summary", CACHE_TTL_GITLAB)
 async def get_late_summary(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
     created_before: str = Query(..., description="Date ISO pour filtrer les issues"),
 ):
     try:
-        return await gitlab.fetch_late_issues_summary(
-            group_path, created_after, created_before
+        return await coalesced(
+            gitlab.fetch_late_issues_summary, group_path, created_after, created_before
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/gitlab/crah")
+@cached("/gitlab/crah", CACHE_TTL_GITLAB)
 async def get_crah(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
@@ -254,14 +362,15 @@ async def get_crah(
 ):
 
     try:
-        return await gitlab.weekly_activity_report(
-            group_path, created_after, created_before
+        return await coalesced(
+            gitlab.weekly_activity_report, group_path, created_after, created_before
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/gitlab/crah_by_user")
+@cached("/gitlab/crah_by_user", CACHE_TTL_GITLAB)
 async def get_crah(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
@@ -270,39 +379,47 @@ async def get_crah(
 ):
 
     try:
-        return await gitlab.weekly_activity_report_by_user(
-            group_path, created_after, created_before, username
+        return await coalesced(
+            gitlab.weekly_activity_report_by_user,
+            group_path,
+            created_after,
+            created_before,
+            username,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/calendar/full")
+@cached("/calendar/full", CACHE_TTL_CALENDAR)
 async def get_cal():
     try:
-        data = nextcloud.get_nextcloud_events()
+        data = await coalesced(nextcloud.get_nextcloud_events)
         return {"cal": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/calendar/next_class")
+@cached("/calendar/next_class", CACHE_TTL_CALENDAR)
 async def get_cal_next_class():
     try:
-        return nextcloud.get_next_cours()
+        return await coalesced(nextcloud.get_next_cours)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/calendar/next_pic_event")
+@cached("/calendar/next_pic_event", CACHE_TTL_CALENDAR)
 async def get_cal_next_pic_event():
     try:
-        return nextcloud.get_next_pic_event()
+        return await coalesced(nextcloud.get_next_pic_event)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/metrics/anomalies_nc")
+@cached("/metrics/anomalies_nc", CACHE_TTL_GITLAB)
 async def anomalies_nc(
     group_path: str = Query(..., description="Path du groupe GitLab"),
     created_after: str = Query(..., description="Date ISO pour filtrer les issues"),
@@ -312,7 +429,47 @@ async def anomalies_nc(
     Endpoint qui renvoie le nombre d'anomalies et de non-conformités par niveau de gravité.
     """
     try:
-        data = await gitlab.fetch_anomalies_nc_by_level(group_path, created_after, created_before)
+        data = await coalesced(
+            gitlab.fetch_anomalies_nc_by_level,
+            group_path,
+            created_after,
+            created_before,
+        )
         return {"anomalies_nc": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/internal/coalescing")
+async def coalescing_stats():
+    """
+    Compteurs des appels lancés vers les services externes et des appels regroupés.
+    """
+    return singleflight.get_stats()
+
+
+@app.get("/internal/cache")
+async def cache_stats():
+    """
+    Statistiques du cache des réponses (taille, hits, entrées par endpoint).
+    """
+    return response_cache.get_stats()
+
+
+@app.get("/internal/prewarm")
+async def prewarm_stats():
+    """
+    État des cibles de préchauffage du cache (recalculs, échecs, dernière durée).
+    """
+    return prewarm.get_stats()
+
+
+@app.get("/internal/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Métriques au format Prometheus : latence des routes, appels aux services externes,
+    pages par requête paginée, efficacité du cache et appels en cours.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
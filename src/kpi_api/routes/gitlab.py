@@ -2,55 +2,156 @@
 Fonctions pour récupérer et traiter les données de l'API GitLab.
 """
 
+import asyncio
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import pytz
 import re
-import aiohttp
-
-from kpi_api.utils.pagination import fetch_gitlab_paginated_data
-from kpi_api.utils.config import ACCESS_TOKEN
 
+from kpi_api.utils import timing
+from kpi_api.utils.cache import TTLCache
+from kpi_api.utils.config import (
+    GITLAB_SHARDS,
+    PARENT_ISSUE_CACHE_SIZE,
+    PARENT_ISSUE_CACHE_TTL,
+)
+from kpi_api.utils.gitlab_client import graphql_request
+from kpi_api.utils.issue_index import get_issue_index
+from kpi_api.utils.issue_snapshot import get_issue_snapshot
+from kpi_api.utils.issue_store import to_gitlab_time
+from kpi_api.utils.pagination import iter_gitlab_pages
+
+GROUP_TIMELOGS_QUERY = """
+query groupTimelogs($groupPath: ID!, $startTime: Time, $endTime: Time, $after: String) {{
+  group(fullPath: $groupPath) {{
+    timelogs(startTime: $startTime, endTime: $endTime, first: 100, after: $after) {{
+      nodes {{
+        id
+        timeSpent
+        user {{
+          name
+        }}
+        {issue_fields}
+      }}
+      pageInfo {{
+        hasNextPage
+        endCursor
+      }}
+    }}
+  }}
+}}
+"""
 
-async def fetch_time_spent_by_user(group_path: str, created_after: str) -> dict:
-    """
-    Récupère et calcule le temps passé par utilisateur à partir de l'API GitLab.
-    """
-    query = """
-    query timeSpentByUser($groupPath: ID!, $createdAfter: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, first: 100, after: $after) {
-          nodes {
-            timelogs(first: 100) {
-              nodes {
-                timeSpent
-                user {
-                  name
+# Métadonnées des issues nécessaires aux comptes rendus d'activité hebdomadaires
+TIMELOG_ISSUE_FIELDS = """issue {
+          id
+          iid
+          title
+          type
+          projectId
+          timeEstimate
+          totalTimeSpent
+          labels(first: 20) {
+            nodes {
+              title
+            }
+          }
+          discussions(first: 1) {
+            nodes {
+              notes(first: 1) {
+                nodes {
+                  body
                 }
               }
             }
           }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
+        }"""
+
+
+def iter_group_timelogs(
+    group_path: str,
+    start: str | None = None,
+    end: str | None = None,
+    issue_fields: str = "",
+):
     """
+    Itère, page par page, sur les timelogs du groupe dont la date (spentAt) est dans
+    [start, end], sans passer par les issues : seules les issues ayant du temps logué sur
+    la période sont renvoyées, via ``issue_fields``.
 
-    variables = {"groupPath": group_path, "createdAfter": created_after}
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
+    :param group_path: Chemin complet du groupe GitLab.
+    :param start: Date ISO de début (incluse), ou None.
+    :param end: Date ISO de fin (incluse), ou None.
+    :param issue_fields: Sélection GraphQL de l'issue de chaque timelog (ex. TIMELOG_ISSUE_FIELDS).
+    :return: Itérateur asynchrone de pages de timelogs.
+    """
+    variables = {
+        "groupPath": group_path,
+        "startTime": to_gitlab_time(start) if start else None,
+        "endTime": to_gitlab_time(end) if end else None,
+    }
+    return iter_gitlab_pages(
+        GROUP_TIMELOGS_QUERY.format(issue_fields=issue_fields),
+        variables,
+        key_path=["data", "group", "timelogs"],
+        shards=GITLAB_SHARDS,
+        window=("startTime", "endTime"),
     )
 
-    # Agréger le temps par utilisateur
+
+async def _user_work_by_issue(pages, target_username: str) -> list:
+    """
+    Regroupe par issue le temps logué par ``target_username`` (comparaison insensible aux
+    espaces et à la casse), page par page. Les timelogs sans issue (merge requests) sont
+    ignorés ; seules les issues de l'utilisateur sont gardées.
+
+    :param pages: Pages de timelogs (voir ``iter_group_timelogs``).
+    :return: Liste de couples (issue, temps passé par l'utilisateur), dans l'ordre des timelogs.
+    """
+    target = target_username.strip().lower()
+    work = {}
+    async for timelogs in pages:
+        for timelog in timelogs:
+            issue = timelog.get("issue")
+            tl_user = (timelog.get("user") or {}).get("name") or ""
+            if not issue or tl_user.strip().lower() != target:
+                continue
+            entry = work.setdefault(issue["id"], [issue, 0])
+            entry[1] += timelog.get("timeSpent") or 0
+    return [(issue, user_time_spent) for issue, user_time_spent in work.values()]
+
+
+def _issue_wp(issue: dict) -> str:
+    """
+    Extrait le tag WP (Work Package) des labels d'une issue GraphQL, si présent.
+    """
+    for label in (issue.get("labels") or {}).get("nodes", []):
+        if label["title"].startswith("WP::"):
+            return label["title"].split("WP::", 1)[1].strip()
+    return ""
+
+
+def _remaining_time(issue: dict) -> int:
+    """
+    Temps restant estimé d'une issue : timeEstimate - temps total passé, borné à 0.
+    """
+    remaining = (issue.get("timeEstimate") or 0) - (issue.get("totalTimeSpent") or 0)
+    return max(remaining, 0)
+
+
+async def fetch_time_spent_by_user(group_path: str, created_after: str) -> dict:
+    """
+    Récupère et calcule le temps passé par utilisateur à partir de l'API GitLab.
+
+    Le temps est compté sur les timelogs saisis (spentAt) depuis ``created_after``.
+    """
+    # Agréger le temps par utilisateur, page par page
     time_by_user = defaultdict(int)
-    for issue in issues:
-        for timelog in issue.get("timelogs", {}).get("nodes", []):
-            username = timelog["user"]["name"]
-            time_by_user[username] += timelog["timeSpent"]
+    async for timelogs in iter_group_timelogs(group_path, created_after):
+        for timelog in timelogs:
+            username = (timelog.get("user") or {}).get("name")
+            time_by_user[username] += timelog.get("timeSpent") or 0
 
     # format tableau : user | temps
 
@@ -69,65 +170,10 @@ async def fetch_opened_closed_tasks(group_path, created_after, created_before) -
     :return:
     """
 
-    query = """
-    query issuesByDate($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $created_before, first: 100, after: $after) {
-          nodes {
-            createdAt
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-
-    # Récupération des données paginées
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
-
-    # Calculer le nombre d'issues ouvertes et fermées par jour
-    opened_by_day = defaultdict(int)
-    closed_by_day = defaultdict(int)
-
-    for issue in issues:
-        created_date = issue.get("createdAt")
-        closed_date = issue.get("closedAt")
-
-        if created_date:
-            created_day = created_date[:10]  # Extraire la date (YYYY-MM-DD)
-            opened_by_day[created_day] += 1
-
-        if closed_date:
-            closed_day = closed_date[:10]  # Extraire la date (YYYY-MM-DD)
-            closed_by_day[closed_day] += 1
-
-    # res en forme de tableau par jour | fermeture | ouverture
-
-    res = []
-
-    for day in opened_by_day:
-        res.append(
-            {
-                "day": day,
-                "opened": opened_by_day[day],
-                "closed": closed_by_day.get(day, 0),
-            }
-        )
-    return res
+    index = await get_issue_index(group_path)
 
-    # return {"opened_by_day": opened_by_day, "closed_by_day": closed_by_day}
+    # res en forme de tableau par jour | ouverture | fermeture
+    return index.opened_closed(created_after, created_before)
 
 
 async def burndown_chart(group_path, created_after, created_before) -> dict:
@@ -139,86 +185,8 @@ async def burndown_chart(group_path, created_after, created_before) -> dict:
     :return:
     """
 
-    query = """
-    query issuesByDate($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            createdAt
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-
-    # Récupération des données paginées
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
-
-    # Calculer le nombre d'issues ouvertes et fermées par jour
-    opened_by_day = defaultdict(int)
-    closed_by_day = defaultdict(int)
-
-    for issue in issues:
-        created_date = issue.get("createdAt")
-        closed_date = issue.get("closedAt")
-
-        if created_date:
-            created_day = created_date[:10]  # Extraire la date (YYYY-MM-DD)
-            opened_by_day[created_day] += 1
-
-        if closed_date:
-            closed_day = closed_date[:10]  # Extraire la date (YYYY-MM-DD)
-            closed_by_day[closed_day] += 1
-
-    # created before - created after sont en ISO
-    start_date = datetime.fromisoformat(created_after)
-    end_date = datetime.fromisoformat(created_before)
-    current_date = start_date
-    remaining_issues = 0
-    remaining_by_day = []
-    days = []
-
-    while current_date <= end_date:
-        day_str = current_date.strftime("%Y-%m-%d")
-        remaining_issues += opened_by_day.get(day_str, 0)
-        remaining_issues -= closed_by_day.get(day_str, 0)
-        remaining_by_day.append(remaining_issues)
-        days.append(day_str)
-        current_date += timedelta(days=1)
-
-    # Ligne idéale de burndown (doit commencer à remaining_by_day[0], être linéaire et atteindre 0 à la fin)
-    ideal_burndown = [
-        remaining_by_day[0] - i * (remaining_by_day[0] / (len(days) - 1))
-        for i in range(len(days))
-    ]
-    closed_by_day = [closed_by_day.get(day, 0) for day in days]
-
-    res = []
-    for i in range(len(days)):
-        res.append(
-            {
-                "day": days[i],
-                "remaining": remaining_by_day[i],
-                "ideal": ideal_burndown[i],
-                "done": closed_by_day[i],
-            }
-        )
-
-    print(res)
-    return res
+    index = await get_issue_index(group_path)
+    return index.burndown(created_after, created_before)
 
 
 async def resolve_time(group_path: str, created_after: str, created_before) -> dict:
@@ -230,38 +198,10 @@ async def resolve_time(group_path: str, created_after: str, created_before) -> d
     :return:
     """
     # Requête GraphQL modifiée pour récupérer les dates de création et clôture
-    resolution_query = """
-    query resolutionTime($groupPath: ID!, $closedAfter: Time, $closedBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(
-          closedAfter: $closedAfter
-          closedBefore: $closedBefore
-          first: 100
-          after: $after
-        ) {
-          nodes {
-            createdAt
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "closedAfter": created_after,
-        "closedBefore": created_before,
-    }
-
-    # Récupération des données
-    closed_issues = await fetch_gitlab_paginated_data(
-        resolution_query, variables, key_path=["data", "group", "issues"]
+    snapshot = await get_issue_snapshot(
+        group_path, closed_after=created_after, closed_before=created_before
     )
+    closed_issues = snapshot.project("createdAt", "closedAt")
 
     # Calcul des délais de résolution
     resolution_times = []
@@ -302,36 +242,10 @@ async def resolve_time_mean(
     :return:
     """
     # Requête GraphQL modifiée pour récupérer les dates de création et clôture
-    resolution_query = """
-    query resolutionTime($groupPath: ID!, $closedAfter: Time, $closedBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(
-          closedAfter: $closedAfter
-          closedBefore: $closedBefore
-          first: 100
-          after: $after
-        ) {
-          nodes {
-            createdAt
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    """
-    variables = {
-        "groupPath": group_path,
-        "closedAfter": created_after,
-        "closedBefore": created_before,
-    }
-
-    # Récupération des données
-    closed_issues = await fetch_gitlab_paginated_data(
-        resolution_query, variables, key_path=["data", "group", "issues"]
+    snapshot = await get_issue_snapshot(
+        group_path, closed_after=created_after, closed_before=created_before
     )
+    closed_issues = snapshot.project("createdAt", "closedAt")
 
     # Calcul des délais de résolution
     resolution_times = []
@@ -364,51 +278,18 @@ async def temps_passe_par_wp(group_path: str, created_after: str) -> dict:
     """
     Récupère et calcule le temps passé par utilisateur à partir de l'API GitLab.
     """
-    query = """
-    query timeSpentByWP($groupPath: ID!, $createdAfter: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, first: 100, after: $after) {
-          nodes {
-            labels {
-              nodes {
-                title
-              }
-            }
-            timelogs(first: 100) {
-              nodes {
-                timeSpent
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    # Variables pour la requête
-    variables = {"groupPath": group_path, "createdAfter": created_after}
-
-    # Récupération des données
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after)
+    issues = snapshot.project("labels", "timelogs")
 
     # Calculer le temps par work package
     time_by_wp = defaultdict(int)
 
     for issue in issues:
         # Récupérer les labels de l'issue
-        labels = issue.get("labels", {}).get("nodes", [])
-        wp_labels = [
-            label["title"] for label in labels if label["title"].startswith("WP")
-        ]
+        wp_labels = [label for label in issue["labels"] if label.startswith("WP")]
 
         # Ajouter le temps passé pour chaque WP
-        for timelog in issue.get("timelogs", {}).get("nodes", []):
+        for timelog in issue["timelogs"]:
             time_spent = timelog["timeSpent"]
             for wp in wp_labels:
                 time_by_wp[wp] += time_spent
@@ -432,62 +313,10 @@ async def fetch_burnup_data(group_path: str, start_date: str, end_date: str) ->
     """
     Récupère les données pour le burnup chart : total issues et issues fermées par jour.
     """
-    query = """
-    query burnupData($groupPath: ID!, $createdAfter: Time, $createdBefore: Time) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100) {
-          nodes {
-            createdAt
-            closedAt
-          }
-        }
-      }
-    }
-    """
-
-    # Variables pour l'API
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": start_date,
-        "createdBefore": end_date,
-    }
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
-
-    # Organiser les issues par jour
-    created_issues = defaultdict(int)
-    closed_issues = defaultdict(int)
-
-    for issue in issues:
-        created_date = issue["createdAt"][:10]
-        created_issues[created_date] += 1
-
-        if issue["closedAt"]:
-            closed_date = issue["closedAt"][:10]
-            closed_issues[closed_date] += 1
+    index = await get_issue_index(group_path)
 
     # Générer le tableau cumulé
-    current_date = datetime.fromisoformat(start_date)
-    end_date = datetime.fromisoformat(end_date)
-    total_issues = 0
-    issues_closed = 0
-    burnup_data = []
-
-    while current_date <= end_date:
-        day_str = current_date.strftime("%Y-%m-%d")
-        total_issues += created_issues[day_str]
-        issues_closed += closed_issues[day_str]
-        burnup_data.append(
-            {
-                "day": day_str,
-                "total_issues": total_issues,
-                "issues_closed": issues_closed,
-            }
-        )
-        current_date += timedelta(days=1)
-
-    return burnup_data
+    return index.burnup(start_date, end_date)
 
 
 async def fetch_issues_summary(
@@ -497,37 +326,8 @@ async def fetch_issues_summary(
     Récupère un résumé des issues par statut : Completed, Incomplete, et Unstarted,
     basé sur les tags spécifiques et dans une plage de dates donnée.
     """
-    query = """
-    query issuesSummary($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            state
-            labels(first: 10) {
-              nodes {
-                title
-              }
-            }
-            createdAt
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after, created_before)
+    issues = snapshot.project("state", "labels")
 
     # Compter les issues par statut
     completed = 0
@@ -535,7 +335,7 @@ async def fetch_issues_summary(
     unstarted = 0
 
     for issue in issues:
-        labels = [label["title"] for label in issue.get("labels", {}).get("nodes", [])]
+        labels = issue["labels"]
 
         if issue["state"] == "closed":
             completed += 1
@@ -559,43 +359,18 @@ async def fetch_open_issues_count_by_user(
     """
     Récupère le nombre total d'issues ouvertes par utilisateur.
     """
-    query = """
-    query openIssuesByUser($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after, state: opened) {
-          nodes {
-            assignees(first: 10) {
-              nodes {
-                name
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    """
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after, created_before)
+    issues = snapshot.project("state", "assignees")
 
     # Initialiser les données par utilisateur
     issues_by_user = defaultdict(int)
 
     for issue in issues:
-        assignees = [
-            assignee["name"] for assignee in issue.get("assignees", {}).get("nodes", [])
-        ]
+        if issue["state"] != "opened":
+            continue
 
         # Ajouter au compte des utilisateurs assignés
-        for user in assignees:
+        for user in issue["assignees"]:
             issues_by_user[user] += 1
 
     return [{"user": user, "count": count} for user, count in issues_by_user.items()]
@@ -608,32 +383,8 @@ async def fetch_late_issues_summary(
     Récupère le nombre total d'issues et celles en retard
     dans une plage de dates donnée.
     """
-    query = """
-    query issuesSummary($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            state
-            dueDate
-            closedAt
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after, created_before)
+    issues = snapshot.project("state", "dueDate", "closedAt")
 
     total = len(issues)
     late = 0
@@ -699,47 +450,8 @@ async def weekly_activity_report(
     :return: Un dictionnaire dont les clés sont les noms d'utilisateurs et les valeurs sont
              des listes de dictionnaires correspondant aux issues.
     """
-    query = """
-    query weeklyActivityReport($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            iid
-            title
-            timeEstimate
-            labels(first: 10) {
-              nodes {
-                title
-              }
-            }
-            timelogs(first: 100) {
-              nodes {
-                timeSpent
-                user {
-                  name
-                }
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-
-    # Récupération paginée des issues via la fonction utilitaire
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after, created_before)
+    issues = snapshot.project("iid", "title", "timeEstimate", "labels", "timelogs")
 
     # Dictionnaire pour regrouper les informations par utilisateur
     report_by_user = defaultdict(list)
@@ -751,16 +463,14 @@ async def weekly_activity_report(
 
         # Extraction du tag WP
         wp = ""
-        labels = issue.get("labels", {}).get("nodes", [])
-        for label in labels:
-            label_title = label.get("title", "")
+        for label_title in issue["labels"]:
             if label_title.startswith("WP::"):
                 # Récupère ce qui suit "WP::" et supprime d'éventuels espaces
                 wp = label_title.split("WP::", 1)[1].strip()
                 break
 
         # Calcul du temps total passé sur l'issue (tous utilisateurs confondus)
-        timelogs = issue.get("timelogs", {}).get("nodes", [])
+        timelogs = issue["timelogs"]
         total_time_spent_issue = sum(tl.get("timeSpent", 0) for tl in timelogs)
         # Calcul du temps restant estimé (pour l'issue)
         remaining = time_estimate - total_time_spent_issue
@@ -770,7 +480,7 @@ async def weekly_activity_report(
         # Regroupement des timelogs par utilisateur pour cette issue
         user_time = defaultdict(int)
         for tl in timelogs:
-            user = tl.get("user", {}).get("name")
+            user = tl["user"]
             if user:
                 user_time[user] += tl.get("timeSpent", 0)
 
@@ -797,10 +507,10 @@ async def weekly_activity_report_by_user_old(
     Génère un compte rendu d'activité hebdomadaire pour un utilisateur spécifique en se basant
     sur la date de log des timelogs (plutôt que sur la date de création des issues).
 
-    Pour chaque issue, pour chaque timelog :
-      - Si le timelog appartient à target_username et que sa date (spentAt) se situe dans la plage
-        [week_start, week_end], on additionne le temps passé.
-      - Pour l'issue, on calcule également le temps restant estimé (timeEstimate - somme de tous les timelogs).
+    Seuls les timelogs du groupe dont la date (spentAt) se situe dans la plage
+    [week_start, week_end] sont demandés à GitLab, avec les métadonnées de leur issue :
+      - Si le timelog appartient à target_username, on additionne le temps passé.
+      - Pour l'issue, on calcule également le temps restant estimé (timeEstimate - temps total passé).
 
     :param group_path: Chemin complet du groupe GitLab.
     :param week_start: Date de début de la semaine (format ISO).
@@ -809,139 +519,125 @@ async def weekly_activity_report_by_user_old(
     :return: Un dictionnaire avec pour clé le nom de l'utilisateur et la valeur une liste de dictionnaires
              correspondant aux issues travaillées durant la semaine.
     """
-    query = """
-    query weeklyActivityReport($groupPath: ID!, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(first: 100, after: $after) {
-          nodes {
-            iid
-            title
-            timeEstimate
-            labels(first: 10) {
-              nodes {
-                title
-              }
-            }
-            timelogs(first: 100) {
-              nodes {
-                timeSpent
-                spentAt  # Champ à récupérer pour connaître la date du timelog
-                user {
-                  name
-                }
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-    variables = {"groupPath": group_path}
-
-    # Récupération paginée des issues
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
+    timelogs = iter_group_timelogs(
+        group_path, week_start, week_end, TIMELOG_ISSUE_FIELDS
     )
 
-    # Convertir les bornes de la semaine en objets datetime
-    week_start_dt = datetime.fromisoformat(week_start)
-    week_end_dt = datetime.fromisoformat(week_end)
-
     report_for_user = []
 
-    for issue in issues:
-        issue_iid = issue.get("iid")
-        issue_title = issue.get("title")
-        time_estimate = issue.get("timeEstimate") or 0
-
-        # Extraction du tag WP (si présent)
-        wp = ""
-        labels = issue.get("labels", {}).get("nodes", [])
-        for label in labels:
-            label_title = label.get("title", "")
-            if label_title.startswith("WP::"):
-                wp = label_title.split("WP::", 1)[1].strip()
-                break
-
-        timelogs = issue.get("timelogs", {}).get("nodes", [])
-        user_time_spent = 0
-        total_time_spent_issue = 0
-
-        for tl in timelogs:
-            time_spent = tl.get("timeSpent", 0)
-            total_time_spent_issue += time_spent
-            tl_user = tl.get("user", {}).get("name", "")
-            spent_at = tl.get("spentAt")
-            if spent_at:
-                try:
-                    tl_date = datetime.fromisoformat(spent_at)
-                except ValueError:
-                    # Si le format de la date n'est pas conforme, on ignore ce timelog
-                    continue
-
-                # On vérifie si le timelog se situe dans la période de la semaine
-                if week_start_dt <= tl_date <= week_end_dt:
-                    # Comparaison insensible aux espaces et à la casse
-                    if tl_user.strip().lower() == target_username.strip().lower():
-                        user_time_spent += time_spent
-
-        # On ajoute l'issue au rapport seulement si l'utilisateur a logué du temps pendant la semaine
+    # On ajoute une issue au rapport seulement si l'utilisateur a logué du temps pendant la semaine
+    for issue, user_time_spent in await _user_work_by_issue(timelogs, target_username):
         if user_time_spent > 0:
-            remaining = time_estimate - total_time_spent_issue
-            if remaining < 0:
-                remaining = 0
-
             report_for_user.append(
                 {
-                    "iid": issue_iid,
-                    "nom issue": issue_title,
-                    "WP": wp,
+                    "iid": issue.get("iid"),
+                    "nom issue": issue.get("title"),
+                    "WP": _issue_wp(issue),
                     "temps passé total": format_duration(user_time_spent),
-                    "temps restant estimé": format_duration(remaining),
+                    "temps restant estimé": format_duration(_remaining_time(issue)),
                 }
             )
 
     return {target_username: report_for_user}
 
 
-GITLAB_BASE_URL = "https://gitlab.insa-rouen.fr/api/v4"
+PARENT_ISSUES_BATCH_SIZE = 20
+
+# (project_id, iid) -> {"iid", "title", "wp"} ({} si l'issue n'existe pas)
+_parent_issues = TTLCache(PARENT_ISSUE_CACHE_SIZE, PARENT_ISSUE_CACHE_TTL)
+
+
+def _parent_issues_query(count: int) -> str:
+    """
+    Construit une requête récupérant des issues de ``count`` projets, un alias par projet.
+    """
+    parameters = ", ".join(
+        f"$project{i}: [ID!], $iids{i}: [String!]" for i in range(count)
+    )
+    aliases = "\n".join(f"""
+  p{i}: projects(ids: $project{i}) {{
+    nodes {{
+      issues(iids: $iids{i}, first: 100) {{
+        nodes {{
+          iid
+          title
+          labels(first: 20) {{
+            nodes {{
+              title
+            }}
+          }}
+        }}
+      }}
+    }}
+  }}""" for i in range(count))
+    return f"query parentIssues({parameters}) {{{aliases}\n}}"
+
+
+async def resolve_parent_issues(keys: set) -> dict:
+    """
+    Récupère en quelques requêtes GraphQL groupées les issues parentes demandées.
+
+    Les résultats sont gardés dans un cache LRU partagé entre les requêtes, avec une durée
+    de vie courte pour que les renommages apparaissent rapidement.
+
+    :param keys: Ensemble de couples (project_id, iid).
+    :return: Un dictionnaire (project_id, iid) -> {"iid", "title", "wp"} ({} si introuvable).
+    """
+    parents = {}
+    missing_by_project = defaultdict(set)
+    for project_id, iid in keys:
+        cached_parent = _parent_issues.get((project_id, str(iid)))
+        if cached_parent is None:
+            missing_by_project[project_id].add(str(iid))
+        else:
+            parents[(project_id, iid)] = cached_parent
+
+    projects = list(missing_by_project.items())
+    for start in range(0, len(projects), PARENT_ISSUES_BATCH_SIZE):
+        batch = projects[start : start + PARENT_ISSUES_BATCH_SIZE]
+        variables = {}
+        for i, (project_id, iids) in enumerate(batch):
+            variables[f"project{i}"] = [f"gid://gitlab/Project/{project_id}"]
+            variables[f"iids{i}"] = sorted(iids)
+        with timing.span("upstream"):
+            response = await graphql_request(
+                _parent_issues_query(len(batch)), variables
+            )
+        data = response.get("data") or {}
+
+        for i, (project_id, iids) in enumerate(batch):
+            found = {}
+            for project in (data.get(f"p{i}") or {}).get("nodes", []):
+                for parent_issue in (project.get("issues") or {}).get("nodes", []):
+                    # Récupérer le WP du parent si présent
+                    parent_wp = ""
+                    for label in parent_issue.get("labels", {}).get("nodes", []):
+                        if label["title"].startswith("WP::"):
+                            parent_wp = label["title"].split("WP::", 1)[1].strip()
+                            break
+                    found[parent_issue["iid"]] = {
+                        "iid": parent_issue["iid"],
+                        "title": parent_issue.get("title"),
+                        "wp": parent_wp,
+                    }
+            for iid in iids:
+                _parent_issues.set((project_id, iid), found.get(iid, {}))
+
+    for project_id, iid in keys:
+        parents[(project_id, iid)] = _parent_issues.get((project_id, str(iid)), {})
+    return parents
 
 
 async def get_parent_issue(project_id: int, parent_iid: int) -> dict:
     """
-    Récupère l'issue parente en utilisant l'API REST de GitLab.
+    Récupère l'issue parente (voir ``resolve_parent_issues`` pour en récupérer plusieurs).
 
     :param project_id: ID du projet GitLab contenant l'issue parente.
     :param parent_iid: IID de l'issue parente.
     :return: Un dictionnaire contenant l'IID, le titre et le WP de l'issue parente.
     """
-    url = f"{GITLAB_BASE_URL}/projects/{project_id}/issues/{parent_iid}"
-    headers = {"PRIVATE-TOKEN": ACCESS_TOKEN}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                parent_issue = await response.json()
-
-                # Récupérer le WP du parent si présent
-                parent_wp = ""
-                parent_labels = parent_issue.get("labels", [])
-                for label in parent_labels:
-                    if label.startswith("WP::"):
-                        parent_wp = label.split("WP::", 1)[1].strip()
-                        break
-
-                return {
-                    "iid": parent_issue.get("iid"),
-                    "title": parent_issue.get("title"),
-                    "wp": parent_wp,
-                }
-
-    return {}
+    parents = await resolve_parent_issues({(project_id, parent_iid)})
+    return parents[(project_id, parent_iid)]
 
 
 async def weekly_activity_report_by_user(
@@ -951,10 +647,10 @@ async def weekly_activity_report_by_user(
     Génère un rapport d'activité hebdomadaire pour un utilisateur en se basant sur la date du timelog (spentAt)
     plutôt que sur la date de création des issues.
 
-    Pour chaque issue, pour chaque timelog :
-      - On vérifie si la date du timelog (spentAt) se situe dans la plage [week_start, week_end].
-      - Si c'est le cas et que le timelog appartient à target_username, on additionne le temps passé.
-      - Pour l'issue, on calcule le temps restant estimé (timeEstimate - somme de tous les timelogs).
+    Seuls les timelogs du groupe dont la date (spentAt) se situe dans la plage
+    [week_start, week_end] sont demandés à GitLab, avec les métadonnées de leur issue :
+      - Si le timelog appartient à target_username, on additionne le temps passé.
+      - Pour l'issue, on calcule le temps restant estimé (timeEstimate - temps total passé).
 
     De plus, si l'issue est de type TASK, on vérifie la présence d'un parent pour formater l'affichage.
 
@@ -964,142 +660,85 @@ async def weekly_activity_report_by_user(
     :param target_username: Nom d'utilisateur GitLab.
     :return: Un dictionnaire structuré par utilisateur.
     """
-    # La requête ne filtre plus sur la date de création de l'issue
-    query = """
-    query weeklyActivityReport($groupPath: ID!, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(first: 100, after: $after) {
-          nodes {
-            iid
-            title
-            type
-            timeEstimate
-            projectId
-            labels(first: 10) {
-              nodes {
-                title
-              }
-            }
-            timelogs(first: 100) {
-              nodes {
-                timeSpent
-                spentAt
-                user {
-                  name
-                }
-              }
-            }
-            discussions(first: 1) {
-              nodes {
-                notes(first: 1) {
-                  nodes {
-                    body
-                  }
-                }
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    """
-    variables = {"groupPath": group_path}
-
-    # Récupération paginée des issues
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
+    # Seuls les timelogs de la période sont demandés, avec les métadonnées de leur issue
+    timelogs = iter_group_timelogs(
+        group_path, week_start, week_end, TIMELOG_ISSUE_FIELDS
     )
 
-    # Conversion des bornes de la période en objets datetime
-    week_start_dt = datetime.fromisoformat(week_start)
-    week_end_dt = datetime.fromisoformat(week_end)
+    worked_issues = []
 
-    report_for_user = []
-
-    for issue in issues:
-        issue_iid = issue.get("iid")
-        issue_title = issue.get("title")
-        issue_type = issue.get("type")  # Pour vérifier si c'est une TASK
-        project_id = issue.get("projectId")
-        time_estimate = issue.get("timeEstimate") or 0
-
-        # Extraction du tag WP (Work Package)
-        wp = ""
-        labels = issue.get("labels", {}).get("nodes", [])
-        for label in labels:
-            label_title = label.get("title", "")
-            if label_title.startswith("WP::"):
-                wp = label_title.split("WP::", 1)[1].strip()
-                break
+    # On garde l'issue uniquement si l'utilisateur a logué du temps dans la période
+    for issue, user_time_spent in await _user_work_by_issue(timelogs, target_username):
+        if user_time_spent <= 0:
+            continue
 
-        timelogs = issue.get("timelogs", {}).get("nodes", [])
-        user_time_spent = 0
-        total_time_spent_issue = 0
+        parent_iid = None
+
+        # Si l'issue est une TASK, vérifier la présence d'un parent
+        if issue.get("type") == "TASK":
+            first_note = ""
+            discussions = (issue.get("discussions") or {}).get("nodes", [])
+            if discussions:
+                notes = (discussions[0].get("notes") or {}).get("nodes", [])
+                if notes:
+                    first_note = notes[0].get("body") or ""
+            match = re.search(r"added #(\d+) as parent issue", first_note)
+            if match:
+                parent_iid = match.group(1)
+
+        worked_issues.append(
+            (
+                issue.get("iid"),
+                issue.get("title"),
+                _issue_wp(issue),
+                issue.get("projectId"),
+                parent_iid,
+                user_time_spent,
+                _remaining_time(issue),
+            )
+        )
 
-        for tl in timelogs:
-            time_spent = tl.get("timeSpent", 0)
-            total_time_spent_issue += time_spent
-            tl_user = tl.get("user", {}).get("name", "")
-            spent_at = tl.get("spentAt")
-            if spent_at:
-                try:
-                    tl_date = datetime.fromisoformat(spent_at)
-                except ValueError:
-                    continue
-                # Vérifier si le timelog se situe dans la plage définie par week_start et week_end
-                if week_start_dt <= tl_date <= week_end_dt:
-                    if tl_user.strip().lower() == target_username.strip().lower():
-                        user_time_spent += time_spent
-
-        # On ajoute l'issue au rapport uniquement si l'utilisateur a logué du temps dans la période
-        if user_time_spent > 0:
-            parent_iid = None
-            parent_title = None
-            parent_wp = None
-
-            # Si l'issue est une TASK, vérifier la présence d'un parent
-            if issue_type == "TASK":
-                discussions = issue.get("discussions", {}).get("nodes", [])
-                if discussions:
-                    notes = discussions[0].get("notes", {}).get("nodes", [])
-                    if notes:
-                        first_note = notes[0].get("body", "")
-                        match = re.search(r"added #(\d+) as parent issue", first_note)
-                        if match:
-                            parent_iid = match.group(1)
-                            # Récupération de l'issue parente via une requête GraphQL auxiliaire
-                            parent_issue = await get_parent_issue(
-                                project_id, parent_iid
-                            )
-                            if parent_issue:
-                                parent_title = parent_issue.get("title")
-                                parent_wp = parent_issue.get("wp")
-
-            # Formater l'affichage selon la présence éventuelle d'un parent
-            if parent_iid and parent_title:
-                display_iid = f"{parent_iid}#{issue_iid}"
-                display_title = f"{parent_title} : {issue_title}"
-                wp = parent_wp if parent_wp else wp
-            else:
-                display_iid = issue_iid
-                display_title = issue_title
-
-            remaining = time_estimate - total_time_spent_issue
-            if remaining < 0:
-                remaining = 0
+    # Récupération groupée des issues parentes des TASK
+    parents = await resolve_parent_issues(
+        {
+            (project_id, parent_iid)
+            for _, _, _, project_id, parent_iid, _, _ in worked_issues
+            if parent_iid
+        }
+    )
 
-            report_for_user.append(
-                {
-                    "iid": display_iid,
-                    "nom issue": display_title,
-                    "WP": wp,
-                    "temps passé total": format_duration(user_time_spent),
-                    "temps restant estimé": format_duration(remaining),
-                }
-            )
+    report_for_user = []
+    for (
+        issue_iid,
+        issue_title,
+        wp,
+        project_id,
+        parent_iid,
+        user_time_spent,
+        remaining,
+    ) in worked_issues:
+        parent_issue = parents.get((project_id, parent_iid), {})
+        parent_title = parent_issue.get("title")
+        parent_wp = parent_issue.get("wp")
+
+        # Formater l'affichage selon la présence éventuelle d'un parent
+        if parent_iid and parent_title:
+            display_iid = f"{parent_iid}#{issue_iid}"
+            display_title = f"{parent_title} : {issue_title}"
+            wp = parent_wp if parent_wp else wp
+        else:
+            display_iid = issue_iid
+            display_title = issue_title
+
+        report_for_user.append(
+            {
+                "iid": display_iid,
+                "nom issue": display_title,
+                "WP": wp,
+                "temps passé total": format_duration(user_time_spent),
+                "temps restant estimé": format_duration(remaining),
+            }
+        )
 
     return {target_username: report_for_user}
 
@@ -1115,97 +754,9 @@ async def priority_burndown_chart(group_path, created_after, created_before) ->
     :return: Données pour un burndown chart basé sur les priorités
     """
 
-    query = """
-    query issuesByDateWithPriority($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            createdAt
-            closedAt
-            labels(first: 10) {
-              nodes {
-                title
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-
-    # Récupération des données paginées
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
-
-    # Filtrage des issues avec un tag de priorité
-    priority_issues = []
-    for issue in issues:
-        labels = issue.get("labels", {}).get("nodes", [])
-        has_priority = any(label.get("title", "").startswith("Priorité::") for label in labels)
-        if has_priority:
-            priority_issues.append(issue)
-
-    # Calculer le nombre d'issues ouvertes et fermées par jour
-    opened_by_day = defaultdict(int)
-    closed_by_day = defaultdict(int)
-
-    for issue in priority_issues:
-        created_date = issue.get("createdAt")
-        closed_date = issue.get("closedAt")
-
-        if created_date:
-            created_day = created_date[:10]  # Extraire la date (YYYY-MM-DD)
-            opened_by_day[created_day] += 1
-
-        if closed_date:
-            closed_day = closed_date[:10]  # Extraire la date (YYYY-MM-DD)
-            closed_by_day[closed_day] += 1
-
-    # created before - created after sont en ISO
-    start_date = datetime.fromisoformat(created_after)
-    end_date = datetime.fromisoformat(created_before)
-    current_date = start_date
-    remaining_issues = 0
-    remaining_by_day = []
-    days = []
-
-    while current_date <= end_date:
-        day_str = current_date.strftime("%Y-%m-%d")
-        remaining_issues += opened_by_day.get(day_str, 0)
-        remaining_issues -= closed_by_day.get(day_str, 0)
-        remaining_by_day.append(remaining_issues)
-        days.append(day_str)
-        current_date += timedelta(days=1)
-
-    # Ligne idéale de burndown (doit commencer à remaining_by_day[0], être linéaire et atteindre 0 à la fin)
-    ideal_burndown = [
-        remaining_by_day[0] - i * (remaining_by_day[0] / (len(days) - 1))
-        for i in range(len(days))
-    ]
-    closed_by_day = [closed_by_day.get(day, 0) for day in days]
-
-    res = []
-    for i in range(len(days)):
-        res.append(
-            {
-                "day": days[i],
-                "remaining": remaining_by_day[i],
-                "ideal": ideal_burndown[i],
-                "done": closed_by_day[i],
-            }
-        )
-
-    return res
+    # Seules les issues ayant un tag de priorité (Priorité::*) sont comptées
+    index = await get_issue_index(group_path)
+    return index.burndown(created_after, created_before, priority=True)
 
 
 async def fetch_anomalies_nc_by_level(
@@ -1219,36 +770,8 @@ async def fetch_anomalies_nc_by_level(
     :param created_before: Date ISO de fin
     :return: Comptage des anomalies et non-conformités par niveau
     """
-    query = """
-    query issuesWithAnomaliesAndNC($groupPath: ID!, $createdAfter: Time, $createdBefore: Time, $after: String) {
-      group(fullPath: $groupPath) {
-        issues(createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
-          nodes {
-            labels(first: 20) {
-              nodes {
-                title
-              }
-            }
-          }
-          pageInfo {
-            hasNextPage
-            endCursor
-          }
-        }
-      }
-    }
-    """
-
-    variables = {
-        "groupPath": group_path,
-        "createdAfter": created_after,
-        "createdBefore": created_before,
-    }
-
-    # Récupération des données paginées
-    issues = await fetch_gitlab_paginated_data(
-        query, variables, key_path=["data", "group", "issues"]
-    )
+    snapshot = await get_issue_snapshot(group_path, created_after, created_before)
+    issues = snapshot.project("labels")
 
     # Initialiser les compteurs
     anomalies_by_level = defaultdict(int)
@@ -1256,11 +779,7 @@ async def fetch_anomalies_nc_by_level(
 
     # Analyser les issues pour trouver les tags d'anomalies et de non-conformités
     for issue in issues:
-        labels = issue.get("labels", {}).get("nodes", [])
-        
-        for label in labels:
-            label_title = label.get("title", "")
-            
+        for label_title in issue["labels"]:
             # Traiter les anomalies
             if label_title.startswith("Anomalie::"):
                 try:
@@ -1284,3 +803,50 @@ async def fetch_anomalies_nc_by_level(
     }
 
     return result
+
+
+async def _time_per_wp_since(
+    group_path: str, created_after: str, created_before: str
+) -> dict:
+    return await temps_passe_par_wp(group_path, created_after)
+
+
+# Métriques disponibles dans /metrics/batch, sous le nom de leur endpoint
+BATCH_METRICS = {
+    "opened_closed_issues": fetch_opened_closed_tasks,
+    "burndown": burndown_chart,
+    "burnup": fetch_burnup_data,
+    "priority_burndown": priority_burndown_chart,
+    "resolve_time": resolve_time,
+    "resolve_time_mean": resolve_time_mean,
+    "time_per_wp": _time_per_wp_since,
+    "summary": fetch_issues_summary,
+    "issues_count_by_user": fetch_open_issues_count_by_user,
+    "late_summary": fetch_late_issues_summary,
+    "anomalies_nc": fetch_anomalies_nc_by_level,
+}
+
+
+async def fetch_metrics_batch(
+    group_path: str, created_after: str, created_before: str, metrics: tuple
+) -> dict:
+    """
+    Calcule plusieurs métriques d'un dashboard sur la même fenêtre en un seul appel.
+
+    Toutes les métriques lisent le stockage local des issues du groupe : elles sont
+    lancées ensemble, la première déclenche la synchronisation avec GitLab et les autres
+    attendent cette même synchronisation au lieu de parcourir GitLab chacune.
+
+    :param group_path: Chemin du groupe GitLab
+    :param created_after: Date ISO de début
+    :param created_before: Date ISO de fin
+    :param metrics: Noms des métriques (clés de ``BATCH_METRICS``)
+    :return: Résultat de chaque métrique, par nom
+    """
+    results = await asyncio.gather(
+        *(
+            BATCH_METRICS[name](group_path, created_after, created_before)
+            for name in metrics
+        )
+    )
+    return dict(zip(metrics, results))
@@ -4,62 +4,58 @@ Ce module contient les fonctions permettant de récupérer les heures de travail
 
 import datetime
 
-import requests
+from kpi_api.utils import kimai_directory
+from kpi_api.utils.timesheet_cube import TimesheetCube, get_timesheet_cube
 
-from kpi_api.utils.config import KIMAI_TOKEN, KIMAI_URL
 
+def _window(start_date: str, end_date: str) -> tuple:
+    """
+    Bornes au format attendu par Kimai (date locale sans fuseau ni millisecondes).
+    """
+    return start_date.replace("Z", "")[:19], end_date.replace("Z", "")[:19]
 
-def get_all_users_hours(start_date: str, end_date: str):
+
+async def _users_aliases(ids: list) -> dict:
     """
-    Récupère les heures de travail de tous les utilisateurs pour une période donnée
-    :param start_date:
-    :param end_date:
-    :return:
+    Alias des utilisateurs (id -> alias), depuis l'annuaire en mémoire, rechargé si une
+    feuille de temps porte un utilisateur inconnu.
     """
-    headers = {"Authorization": f"Bearer {KIMAI_TOKEN}"}
+    directory = await kimai_directory.users.resolve(ids)
+    return {uid: user["alias"] for uid, user in directory.items()}
 
-    # 1. Récupération de tous les utilisateurs
-    users_response = requests.get(f"{KIMAI_URL}/api/users", headers=headers)
-    users = {u["id"]: u["alias"] for u in users_response.json()}
-    # print(f"UTILISATEURS DISPONIBLES: {users}", flush=True)
 
-    # 2. Initialisation du résultat avec 0h pour tous
-    result = {uid: 0 for uid in users.keys()}
+async def _activities_names(ids: list) -> dict:
+    """
+    Noms des activités (id -> nom), depuis l'annuaire en mémoire : les feuilles de temps
+    demandées sans full=1 ne portent que l'id de leur activité.
+    """
+    directory = await kimai_directory.activities.resolve(ids)
+    # Selon votre configuration, le nom peut être dans 'name' ou 'alias'
+    return {
+        aid: activity.get("name") or activity.get("alias")
+        for aid, activity in directory.items()
+    }
 
-    # 3. Récupération des feuilles de temps
-    page = 1
-    while True:
-        params = {
-            "begin": start_date.replace("Z", "")[:19],
-            "end": end_date.replace("Z", "")[:19],
-            "page": str(page),
-            "size": "100",
-            "user": "all",  # <-- Clé cruciale pour toutes les feuilles
-        }
-
-        response = requests.get(
-            f"{KIMAI_URL}/api/timesheets", headers=headers, params=params
-        )
-        data = response.json()
-        print(f"PAGE {page} - ENTRIES: {len(data)}", flush=True)
 
-        # 4. Mise à jour des heures
-        for entry in data:
-            user_id = entry.get("user")
-            if isinstance(user_id, dict):  # Cas où user est un objet
-                user_id = user_id.get("id")
+async def _users_hours(cube: TimesheetCube, begin: str, end: str) -> list:
+    """
+    Heures de tous les utilisateurs entre deux dates, lues dans le cube.
+    """
+    # 1. Utilisateurs (annuaire en mémoire)
+    users = await _users_aliases(cube.user_ids)
 
-            if user_id in result:
-                result[user_id] += entry.get("duration", 0)
+    # 2. Initialisation du résultat avec 0h pour tous
+    result = {uid: 0 for uid in users.keys()}
 
-        if len(data) < 100:
-            break
-        page += 1
+    # 3. Mise à jour des heures
+    for user_id, seconds in cube.seconds_by_user(begin, end).items():
+        if user_id in result:
+            result[user_id] += seconds
 
     # supprimer l'user 11
     result.pop(11, None)
 
-    # 5. Conversion et tri
+    # 4. Conversion et tri
     return sorted(
         [
             {"username": users[uid], "hours": round(total / 3600, 2)}
@@ -70,7 +66,19 @@ def get_all_users_hours(start_date: str, end_date: str):
     )
 
 
-def get_all_users_hours_by_activity(start_date: str, end_date: str):
+async def get_all_users_hours(start_date: str, end_date: str):
+    """
+    Récupère les heures de travail de tous les utilisateurs pour une période donnée
+    :param start_date:
+    :param end_date:
+    :return:
+    """
+    begin, end = _window(start_date, end_date)
+    cube = await get_timesheet_cube(begin, end)
+    return await _users_hours(cube, begin, end)
+
+
+async def get_all_users_hours_by_activity(start_date: str, end_date: str):
     """
     Récupère pour chaque utilisateur la répartition des heures travaillées en fonction de l'activité (présentiel, télétravail)
     sur une période donnée.
@@ -87,66 +95,28 @@ def get_all_users_hours_by_activity(start_date: str, end_date: str):
     :return: Une liste de dictionnaires triée par temps total décroissant.
              Exemple d'élément : {'username': 'alice', 'presentiel': 10.5, 'télétravail': 5.0, 'total': 15.5}
     """
-    headers = {"Authorization": f"Bearer {KIMAI_TOKEN}"}
-
-    # 1. Récupération de tous les utilisateurs
-    users_response = requests.get(f"{KIMAI_URL}/api/users", headers=headers)
-    users = {u["id"]: u["alias"] for u in users_response.json()}
-
-    # 2. Initialisation du résultat pour chaque utilisateur (en secondes)
+    # 1. Feuilles de temps de tous les utilisateurs, agrégées dans le cube
+    begin, end = _window(start_date, end_date)
+    cube = await get_timesheet_cube(begin, end)
+
+    # 2. Utilisateurs et activités (annuaires en mémoire), initialisation du résultat
+    # (en secondes)
+    users = await _users_aliases(cube.user_ids)
+    activities = await _activities_names(cube.activity_ids)
     result = {
         uid: {"presentiel": 0, "télétravail": 0, "total": 0} for uid in users.keys()
     }
 
-    # 3. Récupération des feuilles de temps (pagination)
-    page = 1
-    while True:
-        params = {
-            "begin": start_date.replace("Z", "")[:19],
-            "end": end_date.replace("Z", "")[:19],
-            "page": str(page),
-            "size": "100",
-            "user": "all",  # On récupère les feuilles pour tous les utilisateurs
-            "full": "1",  # Demande à l'API de renvoyer les objets complets (pour avoir l'objet activité complet)
-        }
-
-        response = requests.get(
-            f"{KIMAI_URL}/api/timesheets", headers=headers, params=params
-        )
-        data = response.json()
-        print(f"PAGE {page} - ENTRIES: {len(data)}", flush=True)
-        if not data:
-            break
-
-        # 4. Mise à jour des heures en fonction de l'activité
-        for entry in data:
-            # Récupérer l'identifiant de l'utilisateur
-            user_field = entry.get("user")
-            if isinstance(user_field, dict):
-                user_id = user_field.get("id")
-            else:
-                user_id = user_field
-
-            if user_id not in result:
-                continue
-
-            duration = entry.get("duration", 0)  # en secondes
-
-            # Récupération de l'activité
-            activity = entry.get("activity")
-            activity_name = None
-            if isinstance(activity, dict):
-                activity_name = activity.get(
-                    "name"
-                )  # selon votre configuration, la clé peut être 'name' ou 'alias'
-            elif isinstance(activity, str):
-                activity_name = activity
-
-            # Ajout d'un affichage de débogage pour vérifier la valeur de l'activité
-            # (Décommentez la ligne suivante pour voir ce qui est renvoyé)
-            # print(f"User {user_id} - Activity: {activity_name}")
-
-            # Comparaison en prenant en compte d'éventuelles différences de casse et d'espaces
+    # 3. Mise à jour des heures en fonction de l'activité
+    for user_id, by_activity in cube.seconds_by_user_activity(begin, end).items():
+        if user_id not in result:
+            continue
+
+        for activity_id, duration in by_activity.items():
+            activity_name = activities.get(activity_id)
+
+            # Comparaison en prenant en compte d'éventuelles différences de casse et
+            # d'espaces
             if activity_name and activity_name.strip().lower() == "présentiel":
                 result[user_id]["presentiel"] += duration
                 result[user_id]["total"] += duration
@@ -155,14 +125,10 @@ def get_all_users_hours_by_activity(start_date: str, end_date: str):
                 result[user_id]["total"] += duration
             # Si l'activité n'est ni "présentiel" ni "télétravail", on l'ignore.
 
-        if len(data) < 100:
-            break
-        page += 1
-
     # Suppression de l'utilisateur 11 si présent (comme dans la version originale)
     result.pop(11, None)
 
-    # 5. Conversion des secondes en heures et préparation du tri
+    # 4. Conversion des secondes en heures et préparation du tri
     result_list = []
     for uid, durations in result.items():
         result_list.append(
@@ -177,10 +143,7 @@ def get_all_users_hours_by_activity(start_date: str, end_date: str):
     return sorted(result_list, key=lambda x: x["total"], reverse=True)
 
 
-import requests
-
-
-def get_user_hours_by_activity(start_date: str, end_date: str, user: int):
+async def get_user_hours_by_activity(start_date: str, end_date: str, user: int):
     """
     Récupère pour un utilisateur donné la répartition des heures travaillées en fonction de l'activité (présentiel, télétravail)
     sur une période donnée.
@@ -201,67 +164,33 @@ def get_user_hours_by_activity(start_date: str, end_date: str, user: int):
                'total': 15.5
              }
     """
-    headers = {"Authorization": f"Bearer {KIMAI_TOKEN}"}
-
-    # 1. Récupérer tous les utilisateurs pour retrouver les informations de l'utilisateur ciblé
-    users_response = requests.get(f"{KIMAI_URL}/api/users", headers=headers)
-    users_data = users_response.json()
-
-    target_user = None
-    for u in users_data:
-        if u["id"] == user:
-            target_user = u
-            break
-
+    # 1. Retrouver l'utilisateur ciblé dans l'annuaire en mémoire
+    target_user = await kimai_directory.users.get(user)
     if not target_user:
         raise ValueError(f"Utilisateur avec l'ID {user} non trouvé.")
 
     # 2. Initialisation des durées (en secondes)
     result = {"presentiel": 0, "télétravail": 0, "total": 0}
 
-    # 3. Récupération des feuilles de temps pour l'utilisateur spécifié (pagination)
-    page = 1
-    while True:
-        params = {
-            "begin": start_date.replace("Z", "")[:19],
-            "end": end_date.replace("Z", "")[:19],
-            "page": str(page),
-            "size": "100",
-            "user": str(user),  # On filtre sur l'utilisateur passé en paramètre
-            "full": "1",  # Pour récupérer l'objet complet (notamment l'activité)
-        }
-
-        response = requests.get(
-            f"{KIMAI_URL}/api/timesheets", headers=headers, params=params
-        )
-        data = response.json()
-        print(f"PAGE {page} - ENTRIES: {len(data)}", flush=True)
-        if not data:
-            break
-
-        # 4. Traitement des feuilles de temps
-        for entry in data:
-            duration = entry.get("duration", 0)
-            activity = entry.get("activity")
-            activity_name = None
-            if isinstance(activity, dict):
-                # Selon votre configuration, l'activité peut être dans 'name' ou 'alias'
-                activity_name = activity.get("name") or activity.get("alias")
-            elif isinstance(activity, str):
-                activity_name = activity
-
-            if activity_name:
-                act = activity_name.strip().lower()
-                if act == "présentiel":
-                    result["presentiel"] += duration
-                    result["total"] += duration
-                elif act == "télétravail":
-                    result["télétravail"] += duration
-                    result["total"] += duration
-
-        if len(data) < 100:
-            break
-        page += 1
+    # 3. Feuilles de temps de l'utilisateur, lues dans le cube partagé par toutes les
+    # routes Kimai pour cette fenêtre
+    begin, end = _window(start_date, end_date)
+    cube = await get_timesheet_cube(begin, end)
+    by_activity = cube.seconds_by_user_activity(begin, end).get(user, {})
+    activities = await _activities_names(list(by_activity))
+
+    # 4. Traitement des durées par activité
+    for activity_id, duration in by_activity.items():
+        activity_name = activities.get(activity_id)
+
+        if activity_name:
+            act = activity_name.strip().lower()
+            if act == "présentiel":
+                result["presentiel"] += duration
+                result["total"] += duration
+            elif act == "télétravail":
+                result["télétravail"] += duration
+                result["total"] += duration
 
     # 5. Conversion des durées en heures (1 heure = 3600 secondes) et arrondi à 2 décimales
     return {
@@ -272,23 +201,33 @@ def get_user_hours_by_activity(start_date: str, end_date: str, user: int):
     }
 
 
-def get_all_current_week_hours():
+async def _week_hours(weeks_ago: int) -> list:
     """
-    Récupère les heures de travail de tous les utilisateurs pour la semaine courante
-    :return:
+    Heures de tous les utilisateurs pour une semaine, lues dans le cube des deux dernières
+    semaines (partagé entre la semaine courante et la précédente).
     """
     today = datetime.date.today()
-    start_date = today - datetime.timedelta(days=today.weekday())
+    monday = today - datetime.timedelta(days=today.weekday())
+    cube = await get_timesheet_cube(
+        f"{monday - datetime.timedelta(days=7)}T00:00:00",
+        f"{monday + datetime.timedelta(days=6)}T23:59:59",
+    )
+    start_date = monday - datetime.timedelta(days=7 * weeks_ago)
     end_date = start_date + datetime.timedelta(days=6)
-    return get_all_users_hours(f"{start_date}T00:00:00Z", f"{end_date}T23:59:59Z")
+    return await _users_hours(cube, f"{start_date}T00:00:00", f"{end_date}T23:59:59")
+
+
+async def get_all_current_week_hours():
+    """
+    Récupère les heures de travail de tous les utilisateurs pour la semaine courante
+    :return:
+    """
+    return await _week_hours(0)
 
 
-def get_all_last_week_hours():
+async def get_all_last_week_hours():
     """
     Récupère les heures de travail de tous les utilisateurs pour la semaine précédente
     :return:
     """
-    today = datetime.date.today()
-    start_date = today - datetime.timedelta(days=today.weekday() + 7)
-    end_date = start_date + datetime.timedelta(days=6)
-    return get_all_users_hours(f"{start_date}T00:00:00Z", f"{end_date}T23:59:59Z")
+    return await _week_hours(1)
@@ -8,11 +8,34 @@ import pytz
 from caldav import DAVClient
 from dateutil.rrule import rruleset, rrulestr
 
+from kpi_api.utils import timing
 from kpi_api.utils.config import (
     NEXTCLOUD_CALDAV_URL,
     NEXTCLOUD_USERNAME,
     NEXTCLOUD_PASSWORD,
 )
+from kpi_api.utils.metrics import observe_upstream
+
+
+def _observe_response(response, *args, **kwargs):
+    observe_upstream(
+        "caldav",
+        response.elapsed.total_seconds(),
+        len(response.content),
+        error=not response.ok,
+    )
+    timing.add("upstream", response.elapsed.total_seconds())
+
+
+def _dav_client() -> DAVClient:
+    """
+    Client CalDAV dont chaque requête HTTP est mesurée (durée, taille, échecs).
+    """
+    client = DAVClient(
+        NEXTCLOUD_CALDAV_URL, username=NEXTCLOUD_USERNAME, password=NEXTCLOUD_PASSWORD
+    )
+    client.session.hooks["response"].append(_observe_response)
+    return client
 
 
 def get_nextcloud_events():
@@ -22,9 +45,7 @@ def get_nextcloud_events():
     :return: Liste d'événements sous forme de dictionnaires
     """
 
-    client = DAVClient(
-        NEXTCLOUD_CALDAV_URL, username=NEXTCLOUD_USERNAME, password=NEXTCLOUD_PASSWORD
-    )
+    client = _dav_client()
     principal = client.principal()
     calendars = principal.calendars()
 
@@ -100,9 +121,7 @@ def get_next_event(calendar_name):
     """
     Récupère le prochain événement à venir strictement après l'heure actuelle.
     """
-    client = DAVClient(
-        NEXTCLOUD_CALDAV_URL, username=NEXTCLOUD_USERNAME, password=NEXTCLOUD_PASSWORD
-    )
+    client = _dav_client()
     principal = client.principal()
     calendars = principal.calendars()
 
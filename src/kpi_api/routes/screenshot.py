@@ -8,60 +8,65 @@ import cv2
 import numpy as np
 from playwright.async_api import async_playwright
 
+from kpi_api.utils import timing
 from kpi_api.utils.config import GITLAB_KNOWN_SIGN_IN, GITLAB_SESSION
+from kpi_api.utils.metrics import track_upstream
 
 
 async def screenshot_issue_board():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-
-        # force dark mode
-        await page.emulate_media(color_scheme="dark")
-
-        # taille de la fenêtre
-        await page.set_viewport_size({"width": 2670, "height": 1800})
-
-        # Définir le cookie d'authentification
-        await page.context.add_cookies(
-            [
-                {
-                    "name": "_gitlab_session",  # Nom du cookie utilisé par GitLab
-                    "value": GITLAB_SESSION,  # Valeur du cookie
-                    "url": "https://gitlab.insa-rouen.fr/",
-                },
-                {
-                    "name": "known_sign_in",  # Nom du cookie utilisé par GitLab
-                    "value": GITLAB_KNOWN_SIGN_IN,
-                    # Valeur du cookie
-                    "url": "https://gitlab.insa-rouen.fr/",
-                },
-                {
-                    "name": "super_sidebar_collapsed",  # Nom du cookie utilisé par GitLab
-                    "value": "true",  # Valeur du cookie
-                    "url": "https://gitlab.insa-rouen.fr/",
-                },
-            ]
-        )
-
-        await page.goto(
-            "https://gitlab.insa-rouen.fr/groups/iti/pic/25/chb/-/boards?iteration_id=Current"
-        )
-
-        # text size
-        await page.evaluate("document.body.style.zoom=2.0")
-
-        # Attendre que le contenu soit chargé
-        await page.wait_for_load_state("networkidle")
-
-        # changer la couleur de fond (--gl-background-color-default : #111217)
-        await page.add_style_tag(
-            content="body { background-color: #111217 !important; }"
-        )
-
-        # Capturer le screenshot
-        screenshot_buffer = await page.screenshot(type="png")
-        await browser.close()
+    # Mesure du lancement de Chromium et du chargement du board
+    with track_upstream("playwright") as call, timing.span("upstream"):
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            page = await browser.new_page()
+
+            # force dark mode
+            await page.emulate_media(color_scheme="dark")
+
+            # taille de la fenêtre
+            await page.set_viewport_size({"width": 2670, "height": 1800})
+
+            # Définir le cookie d'authentification
+            await page.context.add_cookies(
+                [
+                    {
+                        "name": "_gitlab_session",  # Nom du cookie utilisé par GitLab
+                        "value": GITLAB_SESSION,  # Valeur du cookie
+                        "url": "https://gitlab.insa-rouen.fr/",
+                    },
+                    {
+                        "name": "known_sign_in",  # Nom du cookie utilisé par GitLab
+                        "value": GITLAB_KNOWN_SIGN_IN,
+                        # Valeur du cookie
+                        "url": "https://gitlab.insa-rouen.fr/",
+                    },
+                    {
+                        "name": "super_sidebar_collapsed",  # Nom du cookie utilisé par GitLab
+                        "value": "true",  # Valeur du cookie
+                        "url": "https://gitlab.insa-rouen.fr/",
+                    },
+                ]
+            )
+
+            await page.goto(
+                "https://gitlab.insa-rouen.fr/groups/iti/pic/25/chb/-/boards?iteration_id=Current"
+            )
+
+            # text size
+            await page.evaluate("document.body.style.zoom=2.0")
+
+            # Attendre que le contenu soit chargé
+            await page.wait_for_load_state("networkidle")
+
+            # changer la couleur de fond (--gl-background-color-default : #111217)
+            await page.add_style_tag(
+                content="body { background-color: #111217 !important; }"
+            )
+
+            # Capturer le screenshot
+            screenshot_buffer = await page.screenshot(type="png")
+            await browser.close()
+        call.bytes = len(screenshot_buffer)
 
     # recadrer l'image: enlever 115px du haut de l'image (avec opencv) et 30px de la gauche
     screenshot = cv2.imdecode(np.frombuffer(screenshot_buffer, np.uint8), -1)
@@ -0,0 +1,299 @@
+"""
+Cache en mémoire des réponses des endpoints (TTL + LRU, stale-while-revalidate).
+
+Chaque réponse est rangée sous la clé (endpoint, paramètres normalisés). Passé son TTL,
+une entrée reste servie telle quelle pendant qu'une seule tâche de fond la recalcule, afin
+que la latence des panneaux Grafana ne dépende pas de la lenteur de GitLab, Kimai ou CalDAV.
+La taille totale du cache est bornée en octets et chaque endpoint a son propre nombre
+maximal d'entrées ; au-delà, les entrées les moins récemment utilisées sont évincées.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from kpi_api.utils import metrics, timing
+from kpi_api.utils.config import CACHE_MAX_BYTES, CACHE_MAX_STALE
+from kpi_api.utils.responses import RenderedJSONResponse, dumps
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    size: int
+    fresh_until: float
+    stale_until: float
+    refreshing: asyncio.Task | None = field(default=None, repr=False)
+
+
+def _normalize_param(value):
+    """
+    Normalise une valeur de paramètre pour que deux requêtes équivalentes aient la même clé
+    (espaces superflus, dates ISO écrites différemment, listes de valeurs).
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize_param(item) for item in value)
+    return value
+
+
+def make_key(endpoint: str, params: dict) -> tuple:
+    """
+    Construit la clé de cache d'un appel : endpoint + paramètres normalisés et triés.
+    """
+    return endpoint, tuple(
+        sorted(
+            (name, _normalize_param(value))
+            for name, value in params.items()
+            if value is not None
+        )
+    )
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, bytes):
+        return len(value)
+    return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+class ResponseCache:
+    """
+    Cache LRU borné en octets, avec une politique (TTL, nombre d'entrées) par endpoint.
+    """
+
+    def __init__(self, max_bytes: int, max_stale: float):
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._count_by_endpoint: dict[str, int] = {}
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self.size = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        self._count_by_endpoint[key[0]] -= 1
+
+    def _evict_oldest(self, endpoint: str | None = None) -> None:
+        for key in self._entries:
+            if endpoint is None or key[0] == endpoint:
+                self._remove(key)
+                self.evictions += 1
+                return
+
+    def _store(self, key: tuple, value, ttl: float, max_entries: int) -> None:
+        size = _sizeof(value)
+        if size > self.max_bytes or max_entries < 1:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        endpoint = key[0]
+        while self._count_by_endpoint.get(endpoint, 0) >= max_entries:
+            self._evict_oldest(endpoint)
+        while self._entries and self.size + size > self.max_bytes:
+            self._evict_oldest()
+
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(
+            value=value,
+            size=size,
+            fresh_until=now + ttl,
+            stale_until=now + ttl + self.max_stale,
+        )
+        self._count_by_endpoint[endpoint] = self._count_by_endpoint.get(endpoint, 0) + 1
+        self.size += size
+
+    async def _refresh(self, key: tuple, compute, ttl: float, max_entries: int) -> None:
+        try:
+            self._store(key, await compute(), ttl, max_entries)
+        except Exception as e:
+            # On garde la valeur périmée, la prochaine lecture relancera un rafraîchissement
+            logger.warning("Rafraîchissement du cache échoué pour %s : %s", key, e)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = None
+
+    async def get_or_compute(self, key: tuple, compute, ttl: float, max_entries: int):
+        """
+        Retourne la valeur en cache pour ``key`` ou la calcule avec ``compute``.
+
+        :param key: Clé construite par ``make_key``.
+        :param compute: Fonction sans argument retournant une coroutine qui calcule la valeur.
+        :param ttl: Durée (secondes) pendant laquelle la valeur est considérée fraîche.
+        :param max_entries: Nombre maximal d'entrées pour cet endpoint.
+        :return: La valeur (éventuellement périmée, le temps qu'elle soit recalculée).
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self.hits += 1
+                metrics.CACHE_LOOKUPS.inc(endpoint=key[0], result="hit")
+                timing.set_cache("hit")
+                return entry.value
+
+            # Périmée : on la sert et un seul rafraîchissement est lancé en arrière-plan
+            self.stale_hits += 1
+            metrics.CACHE_LOOKUPS.inc(endpoint=key[0], result="stale")
+            timing.set_cache("stale")
+            if entry.refreshing is None:
+                entry.refreshing = asyncio.ensure_future(
+                    self._refresh(key, compute, ttl, max_entries)
+                )
+                self._refresh_tasks.add(entry.refreshing)
+                entry.refreshing.add_done_callback(self._refresh_tasks.discard)
+            return entry.value
+
+        if entry is not None:
+            self._remove(key)
+
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(endpoint=key[0], result="miss")
+        timing.set_cache("miss")
+        value = await compute()
+        self._store(key, value, ttl, max_entries)
+        return value
+
+    async def refresh(self, key: tuple, compute, ttl: float, max_entries: int) -> None:
+        """
+        Recalcule la valeur de ``key`` et la stocke, même si elle est encore fraîche
+        (préchauffage du cache avant les requêtes).
+        """
+        self._store(key, await compute(), ttl, max_entries)
+
+    def discard(self, key: tuple) -> None:
+        """
+        Retire une entrée du cache si elle y est.
+        """
+        if key in self._entries:
+            self._remove(key)
+
+    def invalidate(self, endpoint: str | None = None) -> None:
+        """
+        Vide le cache, entièrement ou pour un seul endpoint.
+        """
+        for key in [k for k in self._entries if endpoint is None or k[0] == endpoint]:
+            self._remove(key)
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0,
+            "entries_by_endpoint": {
+                endpoint: count
+                for endpoint, count in self._count_by_endpoint.items()
+                if count
+            },
+        }
+
+
+response_cache = ResponseCache(CACHE_MAX_BYTES, CACHE_MAX_STALE)
+
+
+def _collect_metrics() -> None:
+    stats = response_cache.get_stats()
+    metrics.CACHE_EVICTIONS.set(stats["evictions"])
+    metrics.CACHE_SIZE.set(stats["size_bytes"])
+    metrics.CACHE_ENTRIES.set(stats["entries"])
+    metrics.CACHE_HIT_RATIO.set(stats["hit_ratio"])
+
+
+metrics.on_collect(_collect_metrics)
+
+
+class TTLCache:
+    """
+    Petit cache LRU à durée de vie fixe, pour des valeurs indexées par clé que l'appelant
+    récupère lui-même (par exemple par lots).
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def cached(endpoint: str, ttl: float, max_entries: int = 128):
+    """
+    Décorateur d'endpoint FastAPI : met en cache la réponse selon les paramètres de la requête.
+
+    La réponse est gardée déjà encodée en JSON : une lecture du cache la renvoie telle
+    quelle, sans nouvelle sérialisation.
+
+    :param endpoint: Nom de l'endpoint (chemin de la route), utilisé dans la clé de cache.
+    :param ttl: Durée (secondes) pendant laquelle la réponse est servie sans recalcul.
+    :param max_entries: Nombre maximal de combinaisons de paramètres gardées pour cet endpoint.
+    """
+    if max_entries < 1:
+        raise ValueError(
+            f"max_entries doit être positif pour {endpoint} : {max_entries}"
+        )
+
+    def decorator(func):
+        async def compute(kwargs: dict) -> bytes:
+            return dumps(await func(**kwargs))
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            body = await response_cache.get_or_compute(
+                make_key(endpoint, kwargs),
+                lambda: compute(kwargs),
+                ttl,
+                max_entries,
+            )
+            return RenderedJSONResponse(body)
+
+        async def refresh(**kwargs) -> tuple:
+            key = make_key(endpoint, kwargs)
+            await response_cache.refresh(key, lambda: compute(kwargs), ttl, max_entries)
+            return key
+
+        # Recalcul forcé de la réponse en cache (voir kpi_api.utils.prewarm)
+        wrapper.refresh = refresh
+        return wrapper
+
+    return decorator
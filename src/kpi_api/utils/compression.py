@@ -0,0 +1,127 @@
+"""
+Compression des réponses selon l'en-tête ``Accept-Encoding`` du client (Grafana).
+
+Brotli (module ``brotli``, dépendance du projet) est utilisé si le client l'accepte,
+sinon gzip. Seules les réponses textuelles (JSON, texte) d'au moins
+``COMPRESSION_MIN_SIZE`` octets sont compressées : en dessous, le gain ne compense pas
+le coût.
+"""
+
+import gzip
+
+from kpi_api.utils import timing
+from kpi_api.utils.config import COMPRESSION_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def _accepted_encodings(headers: list) -> dict:
+    """
+    Encodages acceptés par le client, avec leur poids (q).
+    """
+    accepted = {}
+    for name, value in headers:
+        if name != b"accept-encoding":
+            continue
+        for item in value.decode("latin-1").split(","):
+            encoding, _, params = item.strip().partition(";")
+            weight = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    weight = float(params[2:])
+                except ValueError:
+                    weight = 0.0
+            if encoding:
+                accepted[encoding.strip().lower()] = weight
+    return accepted
+
+
+def choose_encoding(headers: list) -> str | None:
+    """
+    Choisit l'encodage de la réponse ("br", "gzip" ou None) à partir des en-têtes ASGI
+    de la requête.
+    """
+    accepted = _accepted_encodings(headers)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI compressant les réponses en gzip ou brotli (voir le module).
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(scope["headers"])
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if start_message is None and message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if b"content-encoding" in headers or not content_type.startswith(
+                    COMPRESSIBLE_TYPES
+                ):
+                    # Réponse déjà compressée ou binaire : transmise telle quelle
+                    start_message = False
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if start_message is False or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = [
+                (name, value)
+                for name, value in start_message.get("headers", [])
+                if name != b"content-length"
+            ]
+            if len(body) >= self.minimum_size:
+                with timing.span("compress"):
+                    body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -9,12 +9,77 @@ load_dotenv()
 GITLAB_URL = os.getenv("GITLAB_URL", "https://gitlab.example.com/api/graphql")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "votre_token_gitlab")
 
+# Pool de connexions partagé vers GitLab
+GITLAB_POOL_SIZE = int(os.getenv("GITLAB_POOL_SIZE", "20"))
+GITLAB_KEEPALIVE_TIMEOUT = float(os.getenv("GITLAB_KEEPALIVE_TIMEOUT", "30"))
+GITLAB_TIMEOUT = float(os.getenv("GITLAB_TIMEOUT", "60"))
+
+# Pagination découpée en sous-fenêtres de dates : nombre de sous-fenêtres et nombre
+# maximal de sous-fenêtres paginées en même temps
+GITLAB_SHARDS = int(os.getenv("GITLAB_SHARDS", "4"))
+GITLAB_SHARD_CONCURRENCY = int(os.getenv("GITLAB_SHARD_CONCURRENCY", "4"))
+
+# Nombre d'issues dont les timelogs restants sont demandés dans une même requête
+GITLAB_NESTED_BATCH_SIZE = int(os.getenv("GITLAB_NESTED_BATCH_SIZE", "20"))
+
+# Cache des issues parentes (rapport CRAH) : durée de vie en secondes et nombre d'entrées
+PARENT_ISSUE_CACHE_TTL = float(os.getenv("PARENT_ISSUE_CACHE_TTL", "300"))
+PARENT_ISSUE_CACHE_SIZE = int(os.getenv("PARENT_ISSUE_CACHE_SIZE", "1024"))
+
+# Stockage local des issues : intervalle (secondes) entre deux synchronisations
+# incrémentales et entre deux resynchronisations complètes
+ISSUE_STORE_SYNC_INTERVAL = float(os.getenv("ISSUE_STORE_SYNC_INTERVAL", "30"))
+ISSUE_STORE_FULL_RESYNC_INTERVAL = float(
+    os.getenv("ISSUE_STORE_FULL_RESYNC_INTERVAL", "86400")
+)
+
+# Cache des réponses : taille maximale, durée maximale de service d'une valeur périmée
+# et TTL (secondes) par famille d'endpoints
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_STALE = float(os.getenv("CACHE_MAX_STALE", "3600"))
+CACHE_TTL_GITLAB = float(os.getenv("CACHE_TTL_GITLAB", "60"))
+CACHE_TTL_KIMAI = float(os.getenv("CACHE_TTL_KIMAI", "60"))
+CACHE_TTL_CALENDAR = float(os.getenv("CACHE_TTL_CALENDAR", "300"))
+CACHE_TTL_SCREENSHOT = float(os.getenv("CACHE_TTL_SCREENSHOT", "300"))
+
+# Préchauffage du cache : cibles (liste JSON de {"endpoint", "params", "interval"}),
+# nombre maximal de recalculs simultanés, variation aléatoire de l'intervalle (fraction)
+# et fuseau des dashboards pour arrondir les dates relatives ("now/d") comme Grafana
+PREWARM_TARGETS = os.getenv("PREWARM_TARGETS", "[]")
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "0.1"))
+PREWARM_TIMEZONE = os.getenv("PREWARM_TIMEZONE", "UTC")
+
+# Taille minimale (octets) d'une réponse pour qu'elle soit compressée (gzip/brotli)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
 GITLAB_SESSION = os.getenv("GITLAB_SESSION", "votre_cookie_gitlab_session")
 GITLAB_KNOWN_SIGN_IN = os.getenv("GITLAB_KNOWN_SIGN_IN", "votre_cookie_known_sign_in")
 
 KIMAI_URL = os.getenv("KIMAI_URL", "https://kimai.example.com/api/")
 KIMAI_TOKEN = os.getenv("KIMAI_TOKEN", "votre_token_kimai")
 
+# Pool de connexions partagé vers Kimai, nombre de feuilles de temps par page et nombre
+# maximal de pages demandées en même temps
+KIMAI_POOL_SIZE = int(os.getenv("KIMAI_POOL_SIZE", "10"))
+KIMAI_TIMEOUT = float(os.getenv("KIMAI_TIMEOUT", "60"))
+KIMAI_PAGE_SIZE = int(os.getenv("KIMAI_PAGE_SIZE", "500"))
+KIMAI_PAGE_CONCURRENCY = int(os.getenv("KIMAI_PAGE_CONCURRENCY", "6"))
+
+# Annuaires Kimai en mémoire (utilisateurs, activités, projets) : durée de vie en secondes
+KIMAI_DIRECTORY_TTL = float(os.getenv("KIMAI_DIRECTORY_TTL", "3600"))
+
+# Feuilles de temps Kimai agrégées par fenêtre (cube utilisateur × activité × jour) :
+# durée de vie en secondes et nombre de fenêtres gardées
+KIMAI_SNAPSHOT_TTL = float(os.getenv("KIMAI_SNAPSHOT_TTL", "60"))
+KIMAI_SNAPSHOT_MAX_ENTRIES = int(os.getenv("KIMAI_SNAPSHOT_MAX_ENTRIES", "16"))
+
+# Historique local des totaux Kimai des jours clos : fichier SQLite (vide pour désactiver),
+# intervalle (secondes) entre deux recherches de feuilles modifiées et âge maximal d'un jour
+KIMAI_HISTORY_PATH = os.getenv("KIMAI_HISTORY_PATH", "data/kimai_history.sqlite3")
+KIMAI_HISTORY_CHECK_INTERVAL = float(os.getenv("KIMAI_HISTORY_CHECK_INTERVAL", "60"))
+KIMAI_HISTORY_MAX_AGE = float(os.getenv("KIMAI_HISTORY_MAX_AGE", str(7 * 86400)))
+
 NEXTCLOUD_CALDAV_URL = os.getenv(
     "NEXTCLOUD_CALDAV_URL", "https://nextcloud.example.com/remote.php/dav"
 )
@@ -0,0 +1,91 @@
+"""
+Client HTTP asynchrone partagé pour l'API GitLab (GraphQL et REST).
+
+Une seule session aiohttp est ouverte pour toute l'application : elle est créée au démarrage
+de FastAPI (lifespan) et fermée à l'arrêt. Le pool de connexions est borné et les connexions
+sont gardées ouvertes (keep-alive) pour éviter un handshake TLS par page.
+"""
+
+import json
+
+import aiohttp
+
+from kpi_api.utils.config import (
+    ACCESS_TOKEN,
+    GITLAB_KEEPALIVE_TIMEOUT,
+    GITLAB_POOL_SIZE,
+    GITLAB_TIMEOUT,
+    GITLAB_URL,
+)
+from kpi_api.utils.metrics import track_upstream
+
+_session: aiohttp.ClientSession | None = None
+
+
+async def open_session() -> aiohttp.ClientSession:
+    """
+    Ouvre la session partagée (appelé au démarrage de l'application).
+    :return: La session aiohttp partagée.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=GITLAB_POOL_SIZE,
+            keepalive_timeout=GITLAB_KEEPALIVE_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=GITLAB_TIMEOUT),
+            headers={"Authorization": f"Bearer {ACCESS_TOKEN}"},
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """
+    Ferme la session partagée (appelé à l'arrêt de l'application).
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Retourne la session partagée, en l'ouvrant si besoin (scripts, appels hors FastAPI).
+    """
+    if _session is None or _session.closed:
+        return await open_session()
+    return _session
+
+
+async def graphql_request_raw(query: str, variables: dict) -> bytes:
+    """
+    Envoie une requête GraphQL à GitLab et retourne le corps brut de la réponse, sans le
+    décoder (voir ``kpi_api.utils.pagination`` qui y cherche le curseur de la page suivante).
+
+    :param query: La requête GraphQL.
+    :param variables: Les variables associées à la requête.
+    :return: Le corps JSON de la réponse, en octets.
+    """
+    session = await get_session()
+    with track_upstream("gitlab_graphql") as call:
+        async with session.post(
+            GITLAB_URL, json={"query": query, "variables": variables}
+        ) as response:
+            response.raise_for_status()
+            body = await response.read()
+        call.bytes = len(body)
+    return body
+
+
+async def graphql_request(query: str, variables: dict) -> dict:
+    """
+    Envoie une requête GraphQL à GitLab et retourne la réponse JSON décodée.
+
+    :param query: La requête GraphQL.
+    :param variables: Les variables associées à la requête.
+    :return: Le corps de la réponse (clés "data" et éventuellement "errors").
+    """
+    return json.loads(await graphql_request_raw(query, variables))
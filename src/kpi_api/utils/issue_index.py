@@ -0,0 +1,150 @@
+"""
+Index des issues d'un groupe triées par date de création, pour répondre aux changements
+de période de Grafana (zoom, déplacement) sans rescanner les issues ni interroger GitLab.
+
+L'index est reconstruit à partir du stockage local (``kpi_api.utils.issue_store``)
+uniquement quand celui-ci a changé (numéro de version). Les issues de la période sont une
+tranche contiguë des tableaux triés, trouvée par ``np.searchsorted`` ; le nombre d'issues
+créées par jour est lu de la même façon sur les bornes des jours. Les fermetures sont
+comptées parmi les issues créées dans la période, comme le font les graphiques : elles
+sont comptées par jour dans cette tranche à chaque requête.
+"""
+
+import numpy as np
+
+from kpi_api.utils.issue_store import get_issue_store, to_gitlab_time
+from kpi_api.utils.issue_table import IssueTable
+from kpi_api.utils.series import (
+    burndown_rows,
+    burnup_rows,
+    count_by_day,
+    day_window,
+    opened_closed_rows,
+)
+
+SECONDS_PER_DAY = 86400
+
+
+def _to_epoch(value: str) -> int:
+    """
+    Date ISO quelconque -> secondes depuis l'epoch (UTC), tronquée à la seconde comme
+    les comparaisons de ``IssueStore.select``.
+    """
+    return int(np.datetime64(to_gitlab_time(value)[:19], "s").astype(np.int64))
+
+
+class _SortedIssues:
+    """
+    Dates de création (secondes, triées) et jours de création/fermeture d'un ensemble
+    d'issues.
+    """
+
+    def __init__(self, created_at: np.ndarray, closed_at: np.ndarray):
+        order = np.argsort(created_at, kind="stable")
+        self.created_at = created_at[order].astype(np.int64)
+        self.created_day = created_at[order].astype("datetime64[D]")
+        self.closed_day = closed_at[order].astype("datetime64[D]")
+
+    def window(self, start: str | None, end: str | None) -> tuple:
+        """
+        Indices [i, j) des issues créées entre ``start`` et ``end`` (inclus).
+        """
+        i = np.searchsorted(self.created_at, _to_epoch(start)) if start else 0
+        j = (
+            np.searchsorted(self.created_at, _to_epoch(end), side="right")
+            if end
+            else len(self.created_at)
+        )
+        return int(i), int(max(i, j))
+
+    def opened_by_day(
+        self, i: int, j: int, origin: np.datetime64, length: int
+    ) -> np.ndarray:
+        """
+        Nombre d'issues de la tranche [i, j) créées chaque jour de la période.
+        """
+        first_day = origin.astype(np.int64)
+        bounds = (first_day + np.arange(length + 1)) * SECONDS_PER_DAY
+        positions = np.clip(np.searchsorted(self.created_at, bounds), i, j)
+        return np.diff(positions)
+
+    def closed_by_day(
+        self, i: int, j: int, origin: np.datetime64, length: int
+    ) -> np.ndarray:
+        """
+        Nombre d'issues de la tranche [i, j) fermées chaque jour de la période.
+        """
+        return count_by_day(self.closed_day[i:j], origin, length)
+
+
+class CreationIndex:
+    """
+    Index par date de création de toutes les issues et des issues prioritaires, pour
+    une version donnée du stockage d'issues.
+    """
+
+    def __init__(self, table: IssueTable, version: int):
+        self.version = version
+        created = ~np.isnat(table.created_at)
+        priority = created & table.has_label(
+            lambda label: label.startswith("Priorité::")
+        )
+        self.issues = _SortedIssues(table.created_at[created], table.closed_at[created])
+        self.priority_issues = _SortedIssues(
+            table.created_at[priority], table.closed_at[priority]
+        )
+
+    def _sorted(self, priority: bool) -> _SortedIssues:
+        return self.priority_issues if priority else self.issues
+
+    def burndown(self, start: str, end: str, priority: bool = False) -> list:
+        """
+        Burndown des issues (prioritaires si ``priority``) créées dans [start, end].
+        """
+        issues = self._sorted(priority)
+        origin, length = day_window(start, end)
+        i, j = issues.window(start, end)
+        return burndown_rows(
+            origin,
+            issues.opened_by_day(i, j, origin, length),
+            issues.closed_by_day(i, j, origin, length),
+        )
+
+    def burnup(self, start: str, end: str) -> list:
+        """
+        Burnup des issues créées dans [start, end].
+        """
+        origin, length = day_window(start, end)
+        i, j = self.issues.window(start, end)
+        return burnup_rows(
+            origin,
+            self.issues.opened_by_day(i, j, origin, length),
+            self.issues.closed_by_day(i, j, origin, length),
+        )
+
+    def opened_closed(self, start: str | None, end: str | None) -> list:
+        """
+        Issues créées dans [start, end] : ouvertes et fermées par jour de création.
+        """
+        i, j = self.issues.window(start, end)
+        return opened_closed_rows(
+            self.issues.created_day[i:j], self.issues.closed_day[i:j]
+        )
+
+
+_indexes: dict[str, CreationIndex] = {}
+
+
+async def get_issue_index(group_path: str) -> CreationIndex:
+    """
+    Retourne l'index des issues du groupe, reconstruit si le stockage d'issues a changé
+    depuis le dernier appel.
+
+    :param group_path: Chemin du groupe GitLab.
+    :return: L'index à jour.
+    """
+    store = await get_issue_store(group_path)
+    index = _indexes.get(group_path)
+    if index is None or index.version != store.version:
+        index = _indexes[group_path] = CreationIndex(store.table, store.version)
+    return index
@@ -0,0 +1,62 @@
+"""
+Vue partagée des issues d'un groupe GitLab sur une fenêtre de dates.
+
+Les panneaux d'un même dashboard interrogent tous les mêmes issues avec des champs
+légèrement différents. Les issues sont lues depuis la table en colonnes du stockage local
+du groupe (``kpi_api.utils.issue_store``), tenu à jour par synchronisation incrémentale,
+et chaque fonction de calcul reçoit une projection en lecture seule des champs dont elle
+a besoin.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from kpi_api.utils.issue_store import get_issue_store
+from kpi_api.utils.issue_table import IssueTable
+
+
+@dataclass(frozen=True)
+class IssueSnapshot:
+    """
+    Issues d'un groupe sélectionnées sur une fenêtre donnée, en lecture seule.
+
+    Chaque issue est un ``MappingProxyType`` dont les labels et assignees sont aplatis
+    en tuples de chaînes (``labels`` : titres, ``assignees`` : noms) et les timelogs en
+    tuples de mappings (``timeSpent``, ``spentAt``, ``user``).
+    """
+
+    group_path: str
+    table: IssueTable
+    rows: np.ndarray
+
+    def project(self, *fields: str) -> list:
+        """
+        Retourne une vue en lecture seule des issues restreinte aux champs demandés.
+        :param fields: Noms des champs à conserver (ex. "createdAt", "labels").
+        :return: Liste de ``MappingProxyType``.
+        """
+        return self.table.records(self.rows, fields)
+
+
+async def get_issue_snapshot(
+    group_path: str,
+    created_after: str | None = None,
+    created_before: str | None = None,
+    closed_after: str | None = None,
+    closed_before: str | None = None,
+) -> IssueSnapshot:
+    """
+    Retourne les issues du groupe créées (et/ou fermées) dans la fenêtre donnée, lues
+    depuis le stockage local synchronisé avec GitLab.
+
+    :param group_path: Chemin du groupe GitLab.
+    :param created_after: Date ISO de création minimale.
+    :param created_before: Date ISO de création maximale.
+    :param closed_after: Date ISO de fermeture minimale.
+    :param closed_before: Date ISO de fermeture maximale.
+    :return: L'instantané en lecture seule.
+    """
+    store = await get_issue_store(group_path)
+    rows = store.select(created_after, created_before, closed_after, closed_before)
+    return IssueSnapshot(group_path=group_path, table=store.table, rows=rows)
@@ -0,0 +1,253 @@
+"""
+Stockage local et synchronisation incrémentale des issues d'un groupe GitLab.
+
+Chaque groupe est récupéré entièrement une seule fois (amorçage), puis maintenu à jour en
+demandant à GitLab uniquement les issues modifiées depuis le dernier passage
+(``issues(updatedAfter: <watermark>)``). Les issues modifiées, avec leurs labels, assignees
+et timelogs, remplacent leur ancienne version. Une resynchronisation complète périodique
+permet de prendre en compte les issues supprimées ou déplacées hors du groupe.
+
+Les issues sont gardées en colonnes (``kpi_api.utils.issue_table.IssueTable``) : chaque
+synchronisation construit une nouvelle table, partagée en lecture seule par les calculs.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from kpi_api.utils import timing
+from kpi_api.utils.config import (
+    GITLAB_SHARDS,
+    ISSUE_STORE_FULL_RESYNC_INTERVAL,
+    ISSUE_STORE_SYNC_INTERVAL,
+)
+from kpi_api.utils.gitlab_client import graphql_request
+from kpi_api.utils.issue_table import IssueTable, Vocabulary
+from kpi_api.utils.pagination import iter_gitlab_pages
+
+ISSUES_QUERY = """
+query issueStore($groupPath: ID!, $updatedAfter: Time, $createdAfter: Time, $createdBefore: Time, $after: String) {
+  group(fullPath: $groupPath) {
+    issues(updatedAfter: $updatedAfter, createdAfter: $createdAfter, createdBefore: $createdBefore, first: 100, after: $after) {
+      nodes {
+        id
+        iid
+        title
+        type
+        state
+        projectId
+        createdAt
+        updatedAt
+        closedAt
+        dueDate
+        timeEstimate
+        labels(first: 20) {
+          nodes {
+            title
+          }
+        }
+        assignees(first: 10) {
+          nodes {
+            name
+          }
+        }
+        timelogs(first: 100) {
+          nodes {
+            timeSpent
+            spentAt
+            user {
+              name
+            }
+          }
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+    }
+  }
+}
+"""
+
+OLDEST_ISSUE_QUERY = """
+query oldestIssue($groupPath: ID!) {
+  group(fullPath: $groupPath) {
+    issues(sort: CREATED_ASC, first: 1) {
+      nodes {
+        createdAt
+      }
+    }
+  }
+}
+"""
+
+# Champs des timelogs, pour compléter ceux au-delà de la première page
+TIMELOG_FIELDS = "timeSpent spentAt user { name }"
+
+# Format des dates renvoyées par GitLab, comparable directement en tant que chaîne
+GITLAB_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def to_gitlab_time(value: str) -> str:
+    """
+    Convertit une date ISO quelconque (avec ou sans fuseau, avec millisecondes) au format
+    UTC utilisé par GitLab, pour pouvoir la comparer aux champs createdAt/closedAt.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime(GITLAB_TIME_FORMAT)
+
+
+class IssueStore:
+    """
+    Issues d'un groupe GitLab, en colonnes, tenues à jour par deltas.
+    """
+
+    def __init__(self, group_path: str):
+        self.group_path = group_path
+        self.table = IssueTable.empty(Vocabulary())
+        self.watermark: str | None = None
+        self.version = 0
+        self._seeded_at = 0.0
+        self._synced_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _fetch_table(
+        self, variables: dict, strings: Vocabulary, shards: int = 1
+    ) -> IssueTable:
+        """
+        Récupère les issues page par page : chaque page est convertie en colonnes dès son
+        arrivée, seules les colonnes sont gardées.
+        """
+        chunks = []
+        async for nodes in iter_gitlab_pages(
+            ISSUES_QUERY,
+            variables,
+            key_path=["data", "group", "issues"],
+            shards=shards,
+            nested={"timelogs": TIMELOG_FIELDS},
+        ):
+            chunks.append(IssueTable.from_nodes(nodes, strings))
+        return IssueTable.concat(chunks, strings)
+
+    async def _fetch_all(self) -> IssueTable:
+        """
+        Récupère toutes les issues du groupe en découpant l'historique, de la plus ancienne
+        issue à maintenant, en sous-fenêtres paginées en parallèle.
+        """
+        # Nouveau vocabulaire : les labels renommés ou supprimés ne s'accumulent pas
+        strings = Vocabulary()
+        with timing.span("upstream"):
+            response = await graphql_request(
+                OLDEST_ISSUE_QUERY, {"groupPath": self.group_path}
+            )
+        oldest = ((response.get("data") or {}).get("group") or {}).get("issues") or {}
+        if not oldest.get("nodes"):
+            return IssueTable.empty(strings)
+
+        variables = {
+            "groupPath": self.group_path,
+            "createdAfter": oldest["nodes"][0]["createdAt"],
+            "createdBefore": datetime.now(timezone.utc).strftime(GITLAB_TIME_FORMAT),
+        }
+        return await self._fetch_table(variables, strings, shards=GITLAB_SHARDS)
+
+    async def _fetch_updated(self, updated_after: str) -> IssueTable:
+        variables = {"groupPath": self.group_path, "updatedAfter": updated_after}
+        return await self._fetch_table(variables, self.table.strings)
+
+    def _merge(self, table: IssueTable, replace: bool) -> None:
+        self.table = table if replace else self.table.merge(table)
+
+        updated_at = self.table.updated_at[~np.isnat(self.table.updated_at)]
+        if updated_at.size:
+            latest = np.datetime_as_string(updated_at.max(), unit="s") + "Z"
+            if self.watermark is None or latest > self.watermark:
+                self.watermark = latest
+        self.version += 1
+
+    async def sync(self, force_full: bool = False) -> None:
+        """
+        Met à jour le stockage : amorçage complet au premier appel (ou périodiquement),
+        sinon récupération des seules issues modifiées depuis le watermark.
+        """
+        now = time.monotonic()
+        full = (
+            force_full
+            or self.watermark is None
+            or now - self._seeded_at > ISSUE_STORE_FULL_RESYNC_INTERVAL
+        )
+        if full:
+            table = await self._fetch_all()
+            self.watermark = None
+            self._merge(table, replace=True)
+            self._seeded_at = now
+        else:
+            # updatedAfter est inclusif : les issues du watermark sont refusionnées, sans effet
+            table = await self._fetch_updated(self.watermark)
+            if len(table):
+                self._merge(table, replace=False)
+        self._synced_at = now
+
+    async def ensure_fresh(self) -> "IssueStore":
+        """
+        Synchronise le stockage si la dernière synchronisation date de plus de
+        ``ISSUE_STORE_SYNC_INTERVAL`` secondes. Les appels concurrents attendent la même
+        synchronisation.
+        """
+        if time.monotonic() - self._synced_at < ISSUE_STORE_SYNC_INTERVAL:
+            return self
+        async with self._lock:
+            if time.monotonic() - self._synced_at >= ISSUE_STORE_SYNC_INTERVAL:
+                await self.sync()
+        return self
+
+    def select(
+        self,
+        created_after: str | None = None,
+        created_before: str | None = None,
+        closed_after: str | None = None,
+        closed_before: str | None = None,
+    ) -> np.ndarray:
+        """
+        Retourne les indices (dans ``self.table``) des issues dont les dates de
+        création/fermeture sont dans les bornes données (incluses), comme les filtres
+        createdAfter/closedBefore de GitLab.
+        """
+        table = self.table
+        mask = np.ones(len(table), dtype=bool)
+        for column, limit, lower in (
+            (table.created_at, created_after, True),
+            (table.created_at, created_before, False),
+            (table.closed_at, closed_after, True),
+            (table.closed_at, closed_before, False),
+        ):
+            if limit:
+                bound = np.datetime64(to_gitlab_time(limit)[:19], "s")
+                # Les comparaisons avec NaT (date absente) sont fausses
+                mask &= column >= bound if lower else column <= bound
+        return np.flatnonzero(mask)
+
+
+_stores: dict[str, IssueStore] = {}
+
+
+async def get_issue_store(group_path: str) -> IssueStore:
+    """
+    Retourne le stockage du groupe, synchronisé avec GitLab si nécessaire.
+
+    :param group_path: Chemin du groupe GitLab.
+    :return: Le stockage à jour.
+    """
+    store = _stores.get(group_path)
+    if store is None:
+        store = _stores[group_path] = IssueStore(group_path)
+    return await store.ensure_fresh()
@@ -0,0 +1,339 @@
+"""
+Représentation en colonnes (tableaux NumPy) des issues d'un groupe GitLab.
+
+Plutôt qu'une liste de dictionnaires imbriqués par issue, chaque champ est stocké dans un
+tableau : dates en secondes depuis l'epoch (``datetime64[s]``, NaT si absente), chaînes
+répétées (labels, utilisateurs, type, état) internées en identifiants entiers, et
+connexions imbriquées (labels, assignees, timelogs) à plat avec un tableau d'offsets par
+issue (format CSR : les éléments de l'issue ``i`` sont ``offsets[i]:offsets[i + 1]``).
+
+Une table n'est jamais modifiée après sa construction : les mises à jour en construisent
+une nouvelle (``take`` + ``concat``), qui peut donc être partagée en lecture par tous les
+calculs.
+"""
+
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+import numpy as np
+
+# Valeur NaT d'un datetime64 vue comme int64
+NAT = np.iinfo(np.int64).min
+
+ISSUE_GID_PREFIX = "gid://gitlab/Issue/"
+
+
+class Vocabulary:
+    """
+    Chaînes internées : chaque valeur distincte reçoit un identifiant entier stable.
+    """
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def intern(self, value: str | None) -> int:
+        if value is None:
+            return -1
+        ident = self.ids.get(value)
+        if ident is None:
+            ident = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return ident
+
+    def lookup(self, ident: int) -> str | None:
+        return self.values[ident] if ident >= 0 else None
+
+    def matching(self, predicate) -> np.ndarray:
+        """
+        Identifiants des chaînes vérifiant ``predicate`` (ex. labels "Priorité::*").
+        """
+        return np.array(
+            [ident for ident, value in enumerate(self.values) if predicate(value)],
+            dtype=np.int32,
+        )
+
+
+def _epoch(value: str | None) -> int:
+    """
+    Date ISO (ou date seule, considérée en UTC) -> secondes depuis l'epoch, NAT si vide.
+    """
+    if not value:
+        return NAT
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _times(values: list) -> np.ndarray:
+    return np.array(values, dtype=np.int64).view("datetime64[s]")
+
+
+def _render_times(values: np.ndarray, unit: str = "s") -> list:
+    """
+    Dates -> chaînes au format GitLab ("2025-01-05T10:00:00Z", ou "2025-01-05" pour
+    ``unit="D"``), None pour NaT.
+    """
+    suffix = "Z" if unit == "s" else ""
+    return [
+        None if text == "NaT" else text + suffix
+        for text in np.datetime_as_string(values, unit=unit).tolist()
+    ]
+
+
+class Nested:
+    """
+    Connexion imbriquée à plat : ``offsets`` (une case de plus que d'issues) et une
+    colonne par champ des éléments.
+    """
+
+    def __init__(self, offsets: np.ndarray, columns: dict):
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def build(cls, rows: list, dtypes: dict) -> "Nested":
+        """
+        :param rows: Pour chaque issue, la liste de ses éléments (tuples de champs).
+        :param dtypes: Nom -> dtype de chaque champ, dans l'ordre des tuples.
+        """
+        lengths = np.fromiter((len(items) for items in rows), np.int64, len(rows))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        flat = [item for items in rows for item in items]
+        columns = {}
+        for position, (name, dtype) in enumerate(dtypes.items()):
+            values = np.array([item[position] for item in flat], dtype=np.int64)
+            columns[name] = values.astype(dtype) if dtype != "time" else _times(values)
+        return cls(offsets, columns)
+
+    def row_index(self) -> np.ndarray:
+        """
+        Indice de l'issue de chaque élément.
+        """
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+    def take(self, rows: np.ndarray) -> "Nested":
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        items = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return Nested(
+            offsets, {name: values[items] for name, values in self.columns.items()}
+        )
+
+    @staticmethod
+    def concat(parts: list) -> "Nested":
+        shifts = np.cumsum([0] + [part.offsets[-1] for part in parts[:-1]])
+        return Nested(
+            np.concatenate(
+                [parts[0].offsets[:1]]
+                + [part.offsets[1:] + shift for part, shift in zip(parts, shifts)]
+            ),
+            {
+                name: np.concatenate([part.columns[name] for part in parts])
+                for name in parts[0].columns
+            },
+        )
+
+    def slices(self):
+        """
+        Couples (début, fin) des éléments de chaque issue.
+        """
+        offsets = self.offsets.tolist()
+        return zip(offsets[:-1], offsets[1:])
+
+
+class IssueTable:
+    """
+    Issues d'un groupe en colonnes. ``strings`` est le vocabulaire partagé par les tables
+    d'un même stockage, ce qui permet de les concaténer sans renuméroter.
+    """
+
+    def __init__(self, strings: Vocabulary, columns: dict, nested: dict):
+        self.strings = strings
+        self.columns = columns
+        self.nested = nested
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.labels = nested["labels"]
+        self.assignees = nested["assignees"]
+        self.timelogs = nested["timelogs"]
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def from_nodes(cls, nodes: list, strings: Vocabulary) -> "IssueTable":
+        """
+        Construit la table à partir des issues GraphQL (une seule fois par récupération).
+        En cas de doublon, la dernière version d'une issue est gardée.
+        """
+        nodes = list({node["id"]: node for node in nodes}.values())
+        intern = strings.intern
+        columns = {
+            "id": np.array(
+                [int(node["id"].rsplit("/", 1)[1]) for node in nodes], dtype=np.int64
+            ),
+            "iid": np.array([int(node["iid"]) for node in nodes], dtype=np.int64),
+            "title": np.array([node.get("title") for node in nodes], dtype=object),
+            "type": np.array(
+                [intern(node.get("type")) for node in nodes], dtype=np.int32
+            ),
+            "state": np.array(
+                [intern(node.get("state")) for node in nodes], dtype=np.int32
+            ),
+            "project_id": np.array(
+                [node.get("projectId") or -1 for node in nodes], dtype=np.int64
+            ),
+            "created_at": _times([_epoch(node.get("createdAt")) for node in nodes]),
+            "updated_at": _times([_epoch(node.get("updatedAt")) for node in nodes]),
+            "closed_at": _times([_epoch(node.get("closedAt")) for node in nodes]),
+            "due_date": _times([_epoch(node.get("dueDate")) for node in nodes]),
+            "time_estimate": np.array(
+                [node.get("timeEstimate") or 0 for node in nodes], dtype=np.int64
+            ),
+        }
+
+        def connection(node: dict, name: str) -> list:
+            return (node.get(name) or {}).get("nodes", [])
+
+        nested = {
+            "labels": Nested.build(
+                [
+                    [(intern(label["title"]),) for label in connection(node, "labels")]
+                    for node in nodes
+                ],
+                {"label": np.int32},
+            ),
+            "assignees": Nested.build(
+                [
+                    [(intern(user["name"]),) for user in connection(node, "assignees")]
+                    for node in nodes
+                ],
+                {"user": np.int32},
+            ),
+            "timelogs": Nested.build(
+                [
+                    [
+                        (
+                            timelog.get("timeSpent") or 0,
+                            _epoch(timelog.get("spentAt")),
+                            intern((timelog.get("user") or {}).get("name")),
+                        )
+                        for timelog in connection(node, "timelogs")
+                    ]
+                    for node in nodes
+                ],
+                {"time_spent": np.int64, "spent_at": "time", "user": np.int32},
+            ),
+        }
+        return cls(strings, columns, nested)
+
+    @classmethod
+    def empty(cls, strings: Vocabulary) -> "IssueTable":
+        return cls.from_nodes([], strings)
+
+    def take(self, rows: np.ndarray) -> "IssueTable":
+        """
+        Nouvelle table restreinte aux issues ``rows`` (indices).
+        """
+        return IssueTable(
+            self.strings,
+            {name: values[rows] for name, values in self.columns.items()},
+            {name: nested.take(rows) for name, nested in self.nested.items()},
+        )
+
+    @classmethod
+    def concat(cls, tables: list, strings: Vocabulary) -> "IssueTable":
+        """
+        Nouvelle table contenant les issues de ``tables`` (construites avec le même
+        vocabulaire), dans l'ordre. Une issue présente plusieurs fois (modifiée pendant la
+        pagination) n'est gardée que dans sa dernière version.
+        """
+        if not tables:
+            return cls.empty(strings)
+        table = cls(
+            strings,
+            {
+                name: np.concatenate([table.columns[name] for table in tables])
+                for name in tables[0].columns
+            },
+            {
+                name: Nested.concat([table.nested[name] for table in tables])
+                for name in tables[0].nested
+            },
+        )
+        _, last = np.unique(table.id[::-1], return_index=True)
+        if len(last) < len(table):
+            table = table.take(np.sort(len(table) - 1 - last))
+        return table
+
+    def merge(self, other: "IssueTable") -> "IssueTable":
+        """
+        Remplace les issues présentes dans ``other`` et ajoute les nouvelles.
+        """
+        kept = np.flatnonzero(~np.isin(self.id, other.id))
+        return IssueTable.concat([self.take(kept), other], self.strings)
+
+    def has_label(self, predicate) -> np.ndarray:
+        """
+        Masque des issues ayant au moins un label vérifiant ``predicate``.
+        """
+        matching = np.isin(
+            self.labels.columns["label"], self.strings.matching(predicate)
+        )
+        return np.bincount(self.labels.row_index()[matching], minlength=len(self)) > 0
+
+    def _render(self, field: str, rows: np.ndarray) -> list:
+        lookup = self.strings.lookup
+        if field == "id":
+            return [f"{ISSUE_GID_PREFIX}{ident}" for ident in self.id[rows].tolist()]
+        if field == "iid":
+            return [str(iid) for iid in self.iid[rows].tolist()]
+        if field == "title":
+            return self.title[rows].tolist()
+        if field in ("type", "state"):
+            return [lookup(ident) for ident in self.columns[field][rows].tolist()]
+        if field == "projectId":
+            return [
+                None if ident < 0 else ident for ident in self.project_id[rows].tolist()
+            ]
+        if field in ("createdAt", "updatedAt", "closedAt"):
+            column = {"createdAt": "created_at", "updatedAt": "updated_at"}.get(
+                field, "closed_at"
+            )
+            return _render_times(self.columns[column][rows])
+        if field == "dueDate":
+            return _render_times(self.due_date[rows], unit="D")
+        if field == "timeEstimate":
+            return self.time_estimate[rows].tolist()
+        if field in ("labels", "assignees"):
+            nested = self.nested[field].take(rows)
+            column = "label" if field == "labels" else "user"
+            values = [lookup(ident) for ident in nested.columns[column].tolist()]
+            return [tuple(values[start:end]) for start, end in nested.slices()]
+        if field == "timelogs":
+            nested = self.timelogs.take(rows)
+            columns = nested.columns
+            timelogs = [
+                MappingProxyType(
+                    {"timeSpent": time_spent, "spentAt": spent_at, "user": lookup(user)}
+                )
+                for time_spent, spent_at, user in zip(
+                    columns["time_spent"].tolist(),
+                    _render_times(columns["spent_at"]),
+                    columns["user"].tolist(),
+                )
+            ]
+            return [tuple(timelogs[start:end]) for start, end in nested.slices()]
+        raise KeyError(field)
+
+    def records(self, rows: np.ndarray, fields: tuple) -> list:
+        """
+        Vue en lecture seule des issues ``rows`` restreinte aux champs demandés, avec les
+        noms et formats des champs GraphQL (labels et assignees en tuples de chaînes,
+        timelogs en tuples de mappings ``timeSpent``, ``spentAt``, ``user``).
+        """
+        values = [self._render(field, rows) for field in fields]
+        return [MappingProxyType(dict(zip(fields, row))) for row in zip(*values)]
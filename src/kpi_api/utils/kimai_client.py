@@ -0,0 +1,134 @@
+"""
+Client HTTP asynchrone partagé pour l'API Kimai.
+
+Comme pour GitLab, une seule session aiohttp est ouverte pour toute l'application (créée au
+démarrage de FastAPI, fermée à l'arrêt), avec un pool de connexions borné et gardées
+ouvertes.
+
+Les listes paginées de Kimai (``/api/timesheets``) indiquent le nombre total de pages dans
+l'en-tête ``X-Total-Pages`` : après la première page, les suivantes sont demandées en
+parallèle (au plus ``KIMAI_PAGE_CONCURRENCY`` à la fois), si bien qu'une plage d'un mois
+pour toute l'équipe coûte environ deux allers-retours au lieu d'un par page.
+"""
+
+import asyncio
+import json
+
+import aiohttp
+
+from kpi_api.utils import timing
+from kpi_api.utils.config import (
+    KIMAI_PAGE_CONCURRENCY,
+    KIMAI_POOL_SIZE,
+    KIMAI_TIMEOUT,
+    KIMAI_TOKEN,
+    KIMAI_URL,
+)
+from kpi_api.utils.metrics import observe_pages, track_upstream
+
+_session: aiohttp.ClientSession | None = None
+
+
+async def open_session() -> aiohttp.ClientSession:
+    """
+    Ouvre la session partagée (appelé au démarrage de l'application).
+    :return: La session aiohttp partagée.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=KIMAI_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=KIMAI_TIMEOUT),
+            headers={"Authorization": f"Bearer {KIMAI_TOKEN}"},
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """
+    Ferme la session partagée (appelé à l'arrêt de l'application).
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Retourne la session partagée, en l'ouvrant si besoin (scripts, appels hors FastAPI).
+    """
+    if _session is None or _session.closed:
+        return await open_session()
+    return _session
+
+
+async def _request(path: str, params: dict | None = None) -> tuple:
+    session = await get_session()
+    with track_upstream("kimai") as call:
+        async with session.get(f"{KIMAI_URL}{path}", params=params) as response:
+            response.raise_for_status()
+            body = await response.read()
+            headers = response.headers
+        call.bytes = len(body)
+    return json.loads(body), headers
+
+
+async def kimai_get(path: str, params: dict | None = None):
+    """
+    Envoie une requête GET à l'API Kimai et retourne la réponse JSON décodée.
+
+    :param path: Chemin de l'API (ex. "/api/users").
+    :param params: Paramètres de la requête.
+    :return: Le corps de la réponse.
+    """
+    with timing.span("upstream"):
+        data, _ = await _request(path, params)
+    return data
+
+
+async def kimai_get_all_pages(path: str, params: dict, size: int) -> list:
+    """
+    Récupère toutes les pages d'une liste Kimai et retourne leurs éléments concaténés.
+
+    Le nombre de pages est lu dans l'en-tête ``X-Total-Pages`` de la première réponse ; les
+    pages restantes sont demandées en parallèle. Sans cet en-tête, les pages sont lues une à
+    une jusqu'à une page incomplète.
+
+    :param path: Chemin de l'API (ex. "/api/timesheets").
+    :param params: Paramètres de la requête, hors pagination.
+    :param size: Nombre d'éléments par page.
+    :return: Les éléments de toutes les pages, dans l'ordre des pages.
+    """
+    with timing.span("upstream"):
+        first, headers = await _request(
+            path, {**params, "page": "1", "size": str(size)}
+        )
+        total_pages = headers.get("X-Total-Pages")
+
+        if total_pages is not None:
+            total_pages = int(total_pages)
+            semaphore = asyncio.Semaphore(KIMAI_PAGE_CONCURRENCY)
+
+            async def fetch(page: int) -> list:
+                async with semaphore:
+                    data, _ = await _request(
+                        path, {**params, "page": str(page), "size": str(size)}
+                    )
+                return data
+
+            pages = await asyncio.gather(*(fetch(p) for p in range(2, total_pages + 1)))
+            pages = [first, *pages]
+        else:
+            pages = [first]
+            while len(pages[-1]) >= size:
+                data, _ = await _request(
+                    path, {**params, "page": str(len(pages) + 1), "size": str(size)}
+                )
+                if not data:
+                    break
+                pages.append(data)
+
+    observe_pages("kimai", len(pages))
+    timing.add_pages(len(pages))
+    return [entry for page in pages for entry in page]
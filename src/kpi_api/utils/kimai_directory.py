@@ -0,0 +1,76 @@
+"""
+Annuaires Kimai gardés en mémoire : utilisateurs et activités.
+
+Chaque calcul d'heures a besoin de traduire des identifiants (utilisateur, activité) en
+noms. Plutôt que de retélécharger ``/api/users`` à chaque appel, chaque annuaire est gardé
+en mémoire et rechargé après ``KIMAI_DIRECTORY_TTL`` secondes, ou plus tôt si un
+identifiant inconnu apparaît (nouvel utilisateur, activité créée entre-temps). Un
+identifiant qui reste introuvable ne provoque pas plus d'un rechargement toutes les
+``MISS_REFRESH_INTERVAL`` secondes.
+"""
+
+import asyncio
+import time
+
+from kpi_api.utils.config import KIMAI_DIRECTORY_TTL
+from kpi_api.utils.kimai_client import kimai_get
+
+# Délai minimal (secondes) entre deux rechargements provoqués par un identifiant inconnu
+MISS_REFRESH_INTERVAL = 10
+
+
+class KimaiDirectory:
+    """
+    Entrées d'une liste Kimai (``/api/users``, ``/api/activities``...) indexées par id.
+    """
+
+    def __init__(
+        self, path: str, params: dict | None = None, ttl: float = KIMAI_DIRECTORY_TTL
+    ):
+        self.path = path
+        self.params = params
+        self.ttl = ttl
+        self.entries: dict[int, dict] = {}
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _reload(self, max_age: float) -> None:
+        # Les appels concurrents attendent le même rechargement
+        async with self._lock:
+            if time.monotonic() - self._loaded_at >= max_age:
+                self.entries = {
+                    entry["id"]: entry
+                    for entry in await kimai_get(self.path, self.params)
+                }
+                self._loaded_at = time.monotonic()
+
+    async def all(self) -> dict:
+        """
+        Retourne toutes les entrées (id -> entrée), rechargées si le TTL est écoulé.
+        """
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            await self._reload(self.ttl)
+        return self.entries
+
+    async def resolve(self, ids) -> dict:
+        """
+        Retourne toutes les entrées en rechargeant l'annuaire si l'un des ``ids`` y manque.
+
+        :param ids: Identifiants rencontrés (ex. utilisateurs des feuilles de temps).
+        :return: Les entrées (id -> entrée) ; les ids introuvables restent absents.
+        """
+        entries = await self.all()
+        if any(entry_id not in entries for entry_id in ids):
+            await self._reload(MISS_REFRESH_INTERVAL)
+        return self.entries
+
+    async def get(self, entry_id: int) -> dict | None:
+        """
+        Retourne une entrée par son id, en rechargeant l'annuaire si elle est inconnue.
+        """
+        return (await self.resolve((entry_id,))).get(entry_id)
+
+
+users = KimaiDirectory("/api/users")
+# visible=3 : les activités masquées restent référencées par d'anciennes feuilles
+activities = KimaiDirectory("/api/activities", {"visible": "3"})
@@ -0,0 +1,298 @@
+"""
+Totaux Kimai des jours passés, gardés dans une base SQLite locale.
+
+Les feuilles de temps des jours clos ne changent presque plus : leurs totaux par
+utilisateur, activité et jour sont enregistrés dans ``KIMAI_HISTORY_PATH`` et survivent aux
+redémarrages. Seuls les jours jamais lus sont demandés à Kimai ; la période ouverte
+(aujourd'hui) est toujours relue (voir ``kpi_api.utils.timesheet_cube``).
+
+Au plus toutes les ``KIMAI_HISTORY_CHECK_INTERVAL`` secondes, les feuilles de temps
+modifiées depuis la vérification précédente sont demandées à Kimai (``modified_after``,
+exprimé dans le fuseau de l'utilisateur de l'API, lu sur ``/api/users/me``) : les jours
+qu'elles touchent sont oubliés et seront relus. Une feuille supprimée
+n'apparaît pas dans cette liste : chaque jour est donc aussi relu au bout de
+``KIMAI_HISTORY_MAX_AGE`` secondes.
+
+Les accès à la base SQLite sont bloquants : ils tournent hors de la boucle d'événements
+(``asyncio.to_thread``), un seul à la fois.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from kpi_api.utils.config import (
+    KIMAI_HISTORY_CHECK_INTERVAL,
+    KIMAI_HISTORY_MAX_AGE,
+    KIMAI_HISTORY_PATH,
+    KIMAI_PAGE_SIZE,
+)
+from kpi_api.utils.kimai_client import kimai_get, kimai_get_all_pages
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS day_totals (
+    day TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    activity_id INTEGER,
+    seconds INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS day_totals_day ON day_totals (day);
+CREATE TABLE IF NOT EXISTS loaded_days (
+    day TEXT PRIMARY KEY,
+    loaded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Marge (secondes) retirée de l'heure de vérification, pour ne pas manquer une
+# modification enregistrée pendant la requête ``modified_after``
+MODIFIED_AFTER_MARGIN = 60
+
+# Écart maximal (secondes) entre l'heure locale d'un fuseau et UTC, en retard (UTC-12) :
+# marge utilisée quand le fuseau de l'utilisateur Kimai est inconnu
+MAX_UTC_LAG = 12 * 3600
+
+
+def user_id(entry: dict):
+    """
+    Identifiant de l'utilisateur d'une feuille de temps (id seul, ou objet avec full=1).
+    """
+    user = entry.get("user")
+    if isinstance(user, dict):
+        return user.get("id")
+    return user
+
+
+def entry_day(entry: dict) -> date:
+    # Dates Kimai dans le fuseau de l'utilisateur, comme les bornes des requêtes
+    return date.fromisoformat(entry["begin"][:10])
+
+
+def day_rows(entries: list) -> list:
+    """
+    Agrège des feuilles de temps par jour, utilisateur et activité.
+
+    :param entries: Feuilles de temps Kimai.
+    :return: Liste de tuples (user_id, activity_id, jour, secondes).
+    """
+    totals = defaultdict(int)
+    for entry in entries:
+        uid = user_id(entry)
+        if uid is not None:
+            key = (uid, entry.get("activity"), entry_day(entry))
+            totals[key] += entry.get("duration") or 0
+    return [(uid, aid, day, seconds) for (uid, aid, day), seconds in totals.items()]
+
+
+def _user_timezone(user: dict) -> ZoneInfo | None:
+    """
+    Fuseau d'un utilisateur Kimai (``/api/users/me``), ou None s'il est inconnu.
+    """
+    name = user.get("timezone") or next(
+        (
+            preference.get("value")
+            for preference in user.get("preferences") or []
+            if preference.get("name") == "timezone"
+        ),
+        None,
+    )
+    try:
+        return ZoneInfo(name) if name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _ranges(days: list) -> list:
+    """
+    Regroupe des jours triés en plages contiguës [(premier, dernier), ...].
+    """
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+
+class KimaiHistory:
+    """
+    Totaux par utilisateur, activité et jour des jours clos, dans une base SQLite.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._checked_at = float("-inf")
+        self._timezone: ZoneInfo | None = None
+        self._timezone_read = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Utilisée depuis les threads de asyncio.to_thread, un appel à la fois (sous
+            # self._lock)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    # Accès à la base (bloquants, appelés avec asyncio.to_thread)
+
+    def _forget(self, days: list) -> None:
+        keys = [(day.isoformat(),) for day in days]
+        with self.connection:
+            self.connection.executemany("DELETE FROM day_totals WHERE day = ?", keys)
+            self.connection.executemany("DELETE FROM loaded_days WHERE day = ?", keys)
+
+    def _read_modified_after(self) -> str | None:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'modified_after'"
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _write_modified_after(self, value: str) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('modified_after', ?)", (value,)
+            )
+
+    def _loaded_days(self, first: date, last: date) -> dict:
+        return dict(
+            self.connection.execute(
+                "SELECT day, loaded_at FROM loaded_days WHERE day BETWEEN ? AND ?",
+                (first.isoformat(), last.isoformat()),
+            ).fetchall()
+        )
+
+    def _replace_days(self, days: list, rows: list) -> None:
+        self._forget(days)
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO day_totals VALUES (?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                "INSERT INTO loaded_days VALUES (?, ?)",
+                [(day.isoformat(), now) for day in days],
+            )
+
+    def _select(self, first: date, last: date) -> list:
+        return self.connection.execute(
+            "SELECT user_id, activity_id, day, seconds FROM day_totals "
+            "WHERE day BETWEEN ? AND ?",
+            (first.isoformat(), last.isoformat()),
+        ).fetchall()
+
+    async def _kimai_now(self) -> datetime:
+        """
+        Heure courante dans le fuseau de l'utilisateur de l'API, celui dans lequel Kimai
+        lit ``modified_after`` ; en UTC reculée de ``MAX_UTC_LAG`` si ce fuseau est
+        inconnu, pour ne manquer aucune modification.
+        """
+        if not self._timezone_read:
+            try:
+                self._timezone = _user_timezone(await kimai_get("/api/users/me"))
+                self._timezone_read = True
+            except Exception as e:
+                # Nouvel essai à la prochaine vérification
+                logger.warning("Fuseau de l'utilisateur Kimai illisible : %s", e)
+        now = datetime.now(timezone.utc)
+        if self._timezone is None:
+            return now - timedelta(seconds=MAX_UTC_LAG)
+        return now.astimezone(self._timezone)
+
+    async def today(self) -> date:
+        """
+        Jour courant dans le fuseau de l'utilisateur de l'API Kimai, même horloge que
+        ``modified_after`` : les jours antérieurs sont clos. Si ce fuseau est inconnu,
+        jour courant à UTC-12, pour ne jamais considérer comme clos un jour encore ouvert
+        dans Kimai.
+        """
+        return (await self._kimai_now()).date()
+
+    async def _check_modified(self) -> None:
+        """
+        Oublie les jours dont une feuille de temps a été modifiée depuis la dernière
+        vérification.
+        """
+        if time.monotonic() - self._checked_at < KIMAI_HISTORY_CHECK_INTERVAL:
+            return
+        started = await self._kimai_now() - timedelta(seconds=MODIFIED_AFTER_MARGIN)
+        modified_after = await asyncio.to_thread(self._read_modified_after)
+        if modified_after is not None:
+            params = {"user": "all", "modified_after": modified_after}
+            entries = await kimai_get_all_pages(
+                "/api/timesheets", params, KIMAI_PAGE_SIZE
+            )
+            days = sorted({entry_day(entry) for entry in entries})
+            if days:
+                logger.debug("Historique Kimai : %d jours modifiés", len(days))
+                await asyncio.to_thread(self._forget, days)
+        await asyncio.to_thread(
+            self._write_modified_after, started.strftime("%Y-%m-%dT%H:%M:%S")
+        )
+        self._checked_at = time.monotonic()
+
+    async def _load(self, first: date, last: date) -> None:
+        """
+        Lit auprès de Kimai les jours de [first, last] absents ou trop anciens.
+        """
+        loaded = await asyncio.to_thread(self._loaded_days, first, last)
+        expired = time.time() - KIMAI_HISTORY_MAX_AGE
+        missing = [
+            first + timedelta(days=i)
+            for i in range((last - first).days + 1)
+            if loaded.get((first + timedelta(days=i)).isoformat(), expired) <= expired
+        ]
+        if not missing:
+            return
+
+        async def fetch(start: date, stop: date) -> list:
+            params = {
+                "begin": f"{start}T00:00:00",
+                "end": f"{stop}T23:59:59",
+                "user": "all",
+            }
+            return await kimai_get_all_pages("/api/timesheets", params, KIMAI_PAGE_SIZE)
+
+        ranges = _ranges(missing)
+        pages = await asyncio.gather(*(fetch(start, stop) for start, stop in ranges))
+        wanted = set(missing)
+        rows = [
+            (day.isoformat(), uid, aid, seconds)
+            for entries in pages
+            for uid, aid, day, seconds in day_rows(entries)
+            if day in wanted
+        ]
+        await asyncio.to_thread(self._replace_days, missing, rows)
+        logger.debug("Historique Kimai : %d jours lus", len(missing))
+
+    async def rows(self, first: date, last: date) -> list:
+        """
+        Retourne les totaux des jours clos de [first, last], en lisant auprès de Kimai
+        seulement les jours absents, modifiés ou trop anciens.
+
+        :param first: Premier jour.
+        :param last: Dernier jour (avant aujourd'hui).
+        :return: Liste de tuples (user_id, activity_id, jour, secondes).
+        """
+        async with self._lock:
+            await self._check_modified()
+            await self._load(first, last)
+            rows = await asyncio.to_thread(self._select, first, last)
+        return [(uid, aid, date.fromisoformat(day), s) for uid, aid, day, s in rows]
+
+
+history = KimaiHistory(KIMAI_HISTORY_PATH) if KIMAI_HISTORY_PATH else None
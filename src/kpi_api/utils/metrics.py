@@ -0,0 +1,274 @@
+"""
+Métriques de l'application au format texte de Prometheus (``/internal/metrics``).
+
+Compteurs, jauges et histogrammes minimalistes, sans dépendance : latence de chaque route,
+appels aux services externes (GitLab GraphQL, Kimai, CalDAV, Playwright) avec leur durée
+et leur taille, nombre de pages par requête paginée. Les modules qui tiennent déjà leurs
+propres compteurs (cache des réponses, regroupement des appels) les recopient au moment
+de l'exposition via ``on_collect``.
+
+Les fonctions de Kimai et CalDAV tournent dans des threads : les mises à jour sont donc
+protégées par un verrou.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PAGES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_metrics: list = []
+_collectors: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        """
+        Recopie la valeur d'un compteur tenu ailleurs (voir ``on_collect``).
+        """
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                for bound, count in zip(self.buckets, counts):
+                    le = "+Inf" if bound == float("inf") else str(bound)
+                    samples.append((f"{self.name}_bucket", key + (("le", le),), count))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, counts[-1]))
+        return samples
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "kpi_http_request_duration_seconds",
+    "Durée de traitement des requêtes HTTP, par route.",
+    LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "kpi_http_requests_in_flight", "Requêtes HTTP en cours de traitement."
+)
+UPSTREAM_REQUESTS = Counter(
+    "kpi_upstream_requests_total", "Appels aux services externes, par résultat."
+)
+UPSTREAM_DURATION = Histogram(
+    "kpi_upstream_request_duration_seconds",
+    "Durée des appels aux services externes.",
+    LATENCY_BUCKETS,
+)
+UPSTREAM_BYTES = Counter(
+    "kpi_upstream_response_bytes_total", "Octets reçus des services externes."
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "kpi_upstream_requests_in_flight", "Appels aux services externes en cours."
+)
+UPSTREAM_PAGES = Histogram(
+    "kpi_upstream_pages", "Nombre de pages par requête paginée.", PAGES_BUCKETS
+)
+
+CACHE_LOOKUPS = Counter(
+    "kpi_cache_lookups_total",
+    "Lectures du cache des réponses, par endpoint et résultat (hit, stale, miss).",
+)
+CACHE_EVICTIONS = Counter(
+    "kpi_cache_evictions_total", "Entrées évincées du cache des réponses."
+)
+CACHE_SIZE = Gauge("kpi_cache_size_bytes", "Taille du cache des réponses.")
+CACHE_ENTRIES = Gauge("kpi_cache_entries", "Entrées du cache des réponses.")
+CACHE_HIT_RATIO = Gauge(
+    "kpi_cache_hit_ratio", "Part des lectures servies par le cache des réponses."
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "kpi_singleflight_calls_total",
+    "Appels aux fonctions de récupération, lancés (issued) ou regroupés (coalesced).",
+)
+SINGLEFLIGHT_IN_FLIGHT = Gauge(
+    "kpi_singleflight_in_flight", "Appels de récupération en cours."
+)
+
+
+def observe_upstream(
+    upstream: str, seconds: float, size: int = 0, error: bool = False
+) -> None:
+    """
+    Enregistre un appel terminé à un service externe.
+
+    :param upstream: Nom du service ("gitlab_graphql", "kimai", "caldav", "playwright").
+    :param seconds: Durée de l'appel.
+    :param size: Taille de la réponse en octets.
+    :param error: Vrai si l'appel a échoué.
+    """
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status="error" if error else "ok")
+    UPSTREAM_DURATION.observe(seconds, upstream=upstream)
+    if size:
+        UPSTREAM_BYTES.inc(size, upstream=upstream)
+
+
+class UpstreamCall:
+    """
+    Appel en cours à un service externe : l'appelant renseigne ``bytes`` une fois la
+    réponse reçue.
+    """
+
+    def __init__(self):
+        self.bytes = 0
+
+
+@contextmanager
+def track_upstream(upstream: str):
+    """
+    Mesure un appel à un service externe (durée, taille, échecs, appels en cours).
+
+    :param upstream: Nom du service.
+    :return: Un ``UpstreamCall`` dont l'appelant renseigne la taille de la réponse.
+    """
+    call = UpstreamCall()
+    started = time.perf_counter()
+    error = False
+    UPSTREAM_IN_FLIGHT.inc(upstream=upstream)
+    try:
+        yield call
+    except BaseException:
+        error = True
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(upstream=upstream)
+        observe_upstream(upstream, time.perf_counter() - started, call.bytes, error)
+
+
+def observe_pages(upstream: str, pages: int) -> None:
+    """
+    Enregistre le nombre de pages lues par une requête paginée.
+    """
+    UPSTREAM_PAGES.observe(pages, upstream=upstream)
+
+
+def on_collect(callback) -> None:
+    """
+    Enregistre une fonction appelée avant chaque exposition, pour recopier dans les
+    métriques des compteurs tenus par un autre module.
+    """
+    _collectors.append(callback)
+
+
+def render() -> str:
+    """
+    Retourne toutes les métriques au format texte de Prometheus.
+    """
+    for callback in _collectors:
+        callback()
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI mesurant la durée des requêtes HTTP par route (chemin déclaré, pas
+    l'URL reçue, pour garder un nombre borné de séries).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # La route n'est connue qu'après le routage (renseignée dans le scope)
+            route = getattr(scope.get("route"), "path", "non_routee")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                route=route,
+                method=scope.get("method", ""),
+                status=str(status),
+            )
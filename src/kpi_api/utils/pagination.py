@@ -2,48 +2,353 @@
 Ce module contient des fonctions utilitaires pour gérer la pagination des requêtes GraphQL.
 """
 
-import requests
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
 
-from kpi_api.utils.config import ACCESS_TOKEN, GITLAB_URL
+from kpi_api.utils import timing
+from kpi_api.utils.config import GITLAB_NESTED_BATCH_SIZE, GITLAB_SHARD_CONCURRENCY
+from kpi_api.utils.gitlab_client import graphql_request, graphql_request_raw
+from kpi_api.utils.metrics import observe_pages
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def split_window(start: str, end: str, shards: int) -> list:
+    """
+    Découpe la fenêtre [start, end] en ``shards`` sous-fenêtres contiguës de même durée.
+
+    :param start: Date ISO de début.
+    :param end: Date ISO de fin.
+    :param shards: Nombre de sous-fenêtres souhaité.
+    :return: Liste de couples (début, fin) : ``start`` et ``end`` tels quels aux extrémités,
+        points de découpe intermédiaires au format ISO UTC à la microseconde.
+    """
+    start_dt = _parse_time(start)
+    end_dt = _parse_time(end)
+    if shards <= 1 or end_dt <= start_dt:
+        return [(start, end)]
+
+    step = (end_dt - start_dt) / shards
+    # Bornes extérieures inchangées : la fenêtre découpée est exactement celle demandée
+    bounds = (
+        [start]
+        + [
+            (start_dt + i * step).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            for i in range(1, shards)
+        ]
+        + [end]
+    )
+    return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+
+
+async def iter_gitlab_pages(
+    query: str,
+    variables: dict,
+    key_path: list,
+    shards: int = 1,
+    window: tuple = ("createdAfter", "createdBefore"),
+    nested: dict | None = None,
+):
+    """
+    Itère sur les pages d'une requête GraphQL paginée au fur et à mesure de leur arrivée,
+    pour que l'appelant puisse agréger chaque page puis l'oublier au lieu d'attendre (et
+    de garder en mémoire) l'ensemble des résultats.
+
+    Les paramètres sont ceux de ``fetch_gitlab_paginated_data``. Avec plusieurs
+    sous-fenêtres, les pages arrivent dans le désordre et les nœuds déjà vus à la borne
+    commune de deux sous-fenêtres (même ``id``) sont retirés.
+
+    :return: Itérateur asynchrone de listes de nœuds (une par page).
+    """
+    after_var, before_var = window
+    sub_windows = []
+    if shards > 1 and variables.get(after_var) and variables.get(before_var):
+        sub_windows = split_window(variables[after_var], variables[before_var], shards)
+
+    if len(sub_windows) > 1:
+        pages = _iter_shards(
+            [
+                {**variables, after_var: start, before_var: end}
+                for start, end in sub_windows
+            ],
+            query,
+            key_path,
+        )
+        seen = set()
+    else:
+        pages = _iter_cursor_chain(query, variables, key_path)
+        seen = None
+
+    # Temps d'attente de GitLab : hors du traitement de chaque page par l'appelant
+    waiting = time.perf_counter()
+    async for nodes in pages:
+        if seen is not None:
+            # Les bornes des sous-fenêtres sont incluses : on dédoublonne par id
+            nodes = [node for node in nodes if node["id"] not in seen]
+            seen.update(node["id"] for node in nodes)
+        if nested:
+            await fetch_nested_overflow(nodes, nested)
+        timing.add("upstream", time.perf_counter() - waiting)
+        timing.add_pages()
+        yield nodes
+        waiting = time.perf_counter()
 
 
 async def fetch_gitlab_paginated_data(
-    query: str, variables: dict, key_path: list
+    query: str,
+    variables: dict,
+    key_path: list,
+    shards: int = 1,
+    window: tuple = ("createdAfter", "createdBefore"),
+    nested: dict | None = None,
 ) -> list:
     """
     Gère la pagination pour les requêtes GraphQL.
 
+    Si ``shards`` > 1 et que les deux bornes de ``window`` sont renseignées dans les variables,
+    la fenêtre est découpée en sous-fenêtres paginées en parallèle (au plus
+    ``GITLAB_SHARD_CONCURRENCY`` à la fois). Les résultats sont alors fusionnés et dédoublonnés
+    sur leur champ ``id``, qui doit donc être demandé dans la requête.
+
+    ``nested`` associe le nom d'une connexion imbriquée dans chaque issue (ex. "timelogs")
+    aux champs de ses nœuds. Les issues dont cette connexion a ``hasNextPage`` sont
+    complétées par des requêtes groupées (voir ``fetch_nested_overflow``) : la requête doit
+    donc demander ``id`` et ``pageInfo { hasNextPage endCursor }`` sur la connexion.
+
+    Pour agréger les pages au fil de l'eau, utiliser ``iter_gitlab_pages``.
+
     Args:
         query (str): La requête GraphQL.
         variables (dict): Les variables associées à la requête.
         key_path (list): Chemin vers les données paginées dans la réponse (ex. ["data", "group", "issues"]).
+        shards (int): Nombre de sous-fenêtres à paginer en parallèle.
+        window (tuple): Noms des variables de début et de fin de la fenêtre à découper.
+        nested (dict): Connexions imbriquées à paginer entièrement, avec leurs champs.
 
     Returns:
         list: Liste des résultats agrégés.
     """
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
     all_data = []
-    end_cursor = None
-    has_next_page = True
+    async for nodes in iter_gitlab_pages(
+        query, variables, key_path, shards, window, nested
+    ):
+        all_data.extend(nodes)
+    return all_data
 
-    while has_next_page:
-        variables["after"] = end_cursor
-        response = requests.post(
-            GITLAB_URL, json={"query": query, "variables": variables}, headers=headers
-        )
-        response.raise_for_status()
 
-        # Extraire les données selon le chemin spécifié
-        data = response.json()
-        current_data = data
-        for key in key_path:
-            current_data = current_data.get(key, {})
+async def _iter_shards(shard_variables: list, query: str, key_path: list):
+    """
+    Pagine les sous-fenêtres en parallèle (au plus ``GITLAB_SHARD_CONCURRENCY`` à la
+    fois) et produit leurs pages dans l'ordre d'arrivée.
+    """
+    semaphore = asyncio.Semaphore(GITLAB_SHARD_CONCURRENCY)
+    # File bornée : les sous-fenêtres ne prennent pas trop d'avance sur le consommateur
+    queue = asyncio.Queue(maxsize=len(shard_variables))
+    done = object()
 
-        if "nodes" in current_data:
-            all_data.extend(current_data["nodes"])
+    async def fetch_shard(variables: dict) -> None:
+        try:
+            async with semaphore:
+                async for nodes in _iter_cursor_chain(query, variables, key_path):
+                    await queue.put(nodes)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(done)
 
-        page_info = current_data.get("pageInfo", {})
-        has_next_page = page_info.get("hasNextPage", False)
-        end_cursor = page_info.get("endCursor", None)
+    tasks = [asyncio.ensure_future(fetch_shard(v)) for v in shard_variables]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    return all_data
+
+def _peek_page_info(raw: bytes) -> dict | None:
+    """
+    Lit le ``pageInfo`` de la connexion paginée directement dans le corps brut, sans
+    décoder toute la réponse : GitLab renvoie les champs dans l'ordre de la requête, le
+    ``pageInfo`` principal est donc le dernier du document (les connexions imbriquées
+    sont dans les nœuds, avant lui). Un guillemet dans une valeur est échappé, la
+    séquence ``"pageInfo"`` ne peut donc pas venir du contenu d'une chaîne.
+
+    :return: Le ``pageInfo`` trouvé, ou None si le corps n'a pas la forme attendue.
+    """
+    position = raw.rfind(b'"pageInfo"')
+    if position < 0:
+        return None
+    start = raw.find(b"{", position)
+    end = raw.find(b"}", start)
+    if start < 0 or end < 0:
+        return None
+    try:
+        page_info = json.loads(raw[start : end + 1])
+    except ValueError:
+        return None
+    return page_info if isinstance(page_info, dict) else None
+
+
+async def _fetch_page(query: str, variables: dict, cursor: str | None) -> tuple:
+    started = time.perf_counter()
+    raw = await graphql_request_raw(query, {**variables, "after": cursor})
+    return raw, time.perf_counter() - started
+
+
+def _discard(task: asyncio.Task | None) -> None:
+    """
+    Annule une requête anticipée devenue inutile (sans laisser d'exception non lue).
+    """
+    if task is None:
+        return
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+
+async def _iter_cursor_chain(query: str, variables: dict, key_path: list):
+    """
+    Suit les curseurs d'une connexion en anticipant : la page suivante est demandée dès
+    que son curseur est lu dans le corps brut (``_peek_page_info``), si bien que le
+    décodage et l'agrégation d'une page se font pendant le téléchargement de la
+    suivante. Le curseur anticipé est vérifié une fois la page décodée ; s'il diffère,
+    la requête est relancée avec le bon curseur.
+    """
+    pending = asyncio.ensure_future(_fetch_page(query, variables, None))
+    page = 0
+    try:
+        while pending is not None:
+            waiting = time.perf_counter()
+            raw, request_time = await pending
+            wait_time = time.perf_counter() - waiting
+            pending = None
+
+            hint = _peek_page_info(raw)
+            if hint and hint.get("hasNextPage") and hint.get("endCursor"):
+                pending = asyncio.ensure_future(
+                    _fetch_page(query, variables, hint["endCursor"])
+                )
+
+            decoding = time.perf_counter()
+            data = json.loads(raw)
+
+            # Extraire les données selon le chemin spécifié
+            current_data = data
+            for key in key_path:
+                current_data = (current_data or {}).get(key, {})
+
+            page_info = current_data.get("pageInfo", {})
+            end_cursor = page_info.get("endCursor", None)
+            if not page_info.get("hasNextPage", False):
+                _discard(pending)
+                pending = None
+            elif pending is None or hint.get("endCursor") != end_cursor:
+                _discard(pending)
+                pending = asyncio.ensure_future(
+                    _fetch_page(query, variables, end_cursor)
+                )
+            decode_time = time.perf_counter() - decoding
+
+            page += 1
+            logger.debug(
+                "Page %d (%s) : %d octets, requête %.3fs, attente %.3fs, décodage %.3fs,"
+                " page suivante anticipée : %s",
+                page,
+                key_path[-1],
+                len(raw),
+                request_time,
+                wait_time,
+                decode_time,
+                hint is not None and pending is not None,
+            )
+            yield current_data.get("nodes", [])
+        observe_pages("gitlab_graphql", page)
+    finally:
+        _discard(pending)
+
+
+def _overflow_query(connection: str, fields: str, count: int) -> str:
+    """
+    Construit une requête qui récupère la page suivante de ``connection`` pour ``count``
+    issues à la fois, chacune sous un alias (i0, i1, ...).
+    """
+    parameters = ", ".join(f"$id{i}: IssueID!, $after{i}: String" for i in range(count))
+    aliases = "\n".join(f"""
+  i{i}: issue(id: $id{i}) {{
+    {connection}(first: 100, after: $after{i}) {{
+      nodes {{ {fields} }}
+      pageInfo {{ hasNextPage endCursor }}
+    }}
+  }}""" for i in range(count))
+    return f"query nestedOverflow({parameters}) {{{aliases}\n}}"
+
+
+async def fetch_nested_overflow(nodes: list, nested: dict) -> None:
+    """
+    Complète les connexions imbriquées tronquées (ex. timelogs au-delà des 100 premiers)
+    sans refaire la requête des issues : seules les issues concernées sont redemandées,
+    regroupées par ``GITLAB_NESTED_BATCH_SIZE`` sous forme d'alias dans une même requête.
+    Les nœuds supplémentaires sont ajoutés en place dans ``nodes``.
+
+    :param nodes: Issues renvoyées par la pagination principale (avec leur champ ``id``).
+    :param nested: Nom de la connexion imbriquée -> champs de ses nœuds.
+    """
+    semaphore = asyncio.Semaphore(GITLAB_SHARD_CONCURRENCY)
+
+    async def fetch_batch(connection: str, fields: str, batch: list) -> list:
+        variables = {}
+        for i, node in enumerate(batch):
+            variables[f"id{i}"] = node["id"]
+            variables[f"after{i}"] = node[connection]["pageInfo"]["endCursor"]
+        async with semaphore:
+            response = await graphql_request(
+                _overflow_query(connection, fields, len(batch)), variables
+            )
+
+        still_pending = []
+        data = response.get("data") or {}
+        for i, node in enumerate(batch):
+            page = (data.get(f"i{i}") or {}).get(connection) or {}
+            node[connection]["nodes"].extend(page.get("nodes", []))
+            node[connection]["pageInfo"] = page.get("pageInfo") or {
+                "hasNextPage": False,
+                "endCursor": None,
+            }
+            if node[connection]["pageInfo"].get("hasNextPage"):
+                still_pending.append(node)
+        return still_pending
+
+    for connection, fields in nested.items():
+        pending = [
+            node
+            for node in nodes
+            if ((node.get(connection) or {}).get("pageInfo") or {}).get("hasNextPage")
+        ]
+        while pending:
+            batches = [
+                pending[i : i + GITLAB_NESTED_BATCH_SIZE]
+                for i in range(0, len(pending), GITLAB_NESTED_BATCH_SIZE)
+            ]
+            results = await asyncio.gather(
+                *(fetch_batch(connection, fields, batch) for batch in batches)
+            )
+            pending = [node for result in results for node in result]
@@ -0,0 +1,280 @@
+"""
+Préchauffage du cache des réponses en arrière-plan.
+
+Après une période sans visite, le premier spectateur d'un dashboard paie tout le coût des
+appels à GitLab, Kimai ou CalDAV (et le lancement de Chromium pour ``/gitlab/screenshot``).
+Les cibles configurées dans ``PREWARM_TARGETS`` sont recalculées périodiquement dans le
+cache, avant qu'on les demande.
+
+Chaque cible est un objet JSON ``{"endpoint": "/metrics/burndown", "params": {...},
+"interval": 300}``. Les paramètres de date peuvent être relatifs, comme les plages de
+Grafana : ``now``, ``now-7d``, ``now-30d/d``, avec les unités s, m, h, d et w. Ils sont
+résolus à chaque recalcul ; comme dans Grafana, ``/d`` et ``/w`` arrondissent au début du
+jour ou de la semaine (dans ``PREWARM_TIMEZONE``), et à leur fin pour ``created_before``.
+
+Grafana envoie des dates exactes à la milliseconde : une réponse préchauffée n'est lue que
+si la plage du dashboard est identique, c'est-à-dire arrondie au jour ou à la semaine
+(``now-7d/d`` → ``now/d``). Une cible dont une date n'est pas arrondie (``now``,
+``now-7d``) ne peut pas correspondre à une requête : elle est calculée sans être rangée
+dans le cache des réponses, ce qui garde à jour les données sous-jacentes (stockage des
+issues, historique Kimai) sans occuper le cache avec des entrées jamais lues.
+
+L'intervalle de chaque cible varie aléatoirement de ``PREWARM_JITTER`` (fraction) et au
+plus ``PREWARM_CONCURRENCY`` recalculs tournent en même temps, pour ne jamais envoyer de
+rafale aux services externes.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from fastapi.routing import APIRoute
+
+from kpi_api.utils.cache import response_cache
+from kpi_api.utils.config import (
+    PREWARM_CONCURRENCY,
+    PREWARM_JITTER,
+    PREWARM_TARGETS,
+    PREWARM_TIMEZONE,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 300
+
+RELATIVE_TIME = re.compile(r"^now(?:([+-]\d+)([smhdw]))?(?:/([dw]))?$")
+UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+# Paramètres qui terminent une plage (``${__to}`` dans Grafana)
+END_PARAMS = {"created_before"}
+
+
+def _is_aligned(value) -> bool:
+    """
+    Vrai si la valeur est absolue ou arrondie au jour ou à la semaine, donc susceptible
+    d'être envoyée à l'identique par Grafana.
+    """
+    match = RELATIVE_TIME.match(value.strip()) if isinstance(value, str) else None
+    return match is None or match.group(3) is not None
+
+
+def resolve_relative_time(
+    value: str, now: datetime | None = None, end: bool = False
+) -> str:
+    """
+    Résout une date relative à la Grafana (ex. "now-7d", "now/d") en date ISO UTC, au
+    format de ``${__from:date:iso}`` (millisecondes). Les autres valeurs sont renvoyées
+    telles quelles.
+
+    :param value: Valeur du paramètre.
+    :param now: Instant de référence avec fuseau (maintenant dans ``PREWARM_TIMEZONE``
+        par défaut).
+    :param end: Fin de plage : ``/d`` et ``/w`` arrondissent à la fin du jour ou de la
+        semaine (23:59:59.999) au lieu de leur début.
+    :return: La date ISO, ou la valeur d'origine si elle n'est pas relative.
+    """
+    match = RELATIVE_TIME.match(value.strip()) if isinstance(value, str) else None
+    if match is None:
+        return value
+
+    amount, unit, rounding = match.groups()
+    moment = now or datetime.now(ZoneInfo(PREWARM_TIMEZONE))
+    if amount:
+        moment += timedelta(**{UNITS[unit]: int(amount)})
+    if rounding:
+        moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        period = timedelta(days=1)
+        if rounding == "w":
+            moment -= timedelta(days=moment.weekday())
+            period = timedelta(weeks=1)
+        if end:
+            moment += period - timedelta(milliseconds=1)
+    moment = moment.astimezone(timezone.utc)
+    return f"{moment:%Y-%m-%dT%H:%M:%S}.{moment.microsecond // 1000:03d}Z"
+
+
+@dataclass
+class PrewarmTarget:
+    endpoint: str
+    params: dict
+    interval: float
+    refresh: object = field(repr=False)
+    compute: object = field(repr=False)
+    key: tuple | None = field(default=None, repr=False)
+    runs: int = 0
+    failures: int = 0
+    last_run: str | None = None
+    last_duration: float | None = None
+    last_error: str | None = None
+
+
+def load_targets(routes: list, raw: str = PREWARM_TARGETS) -> list:
+    """
+    Lit les cibles de préchauffage et les associe aux endpoints en cache de l'application.
+    Les cibles invalides (endpoint inconnu ou sans cache, paramètres manquants ou en trop)
+    sont ignorées avec un message d'erreur.
+
+    :param routes: Routes de l'application FastAPI.
+    :param raw: Liste JSON des cibles.
+    :return: Liste de ``PrewarmTarget``.
+    """
+    try:
+        entries = json.loads(raw or "[]")
+    except ValueError as e:
+        logger.error("PREWARM_TARGETS n'est pas un JSON valide : %s", e)
+        return []
+
+    endpoints = {}
+    for route in routes:
+        if isinstance(route, APIRoute) and "GET" in route.methods:
+            # Première route déclarée pour un chemin : c'est celle que FastAPI sert
+            endpoints.setdefault(route.path, route.endpoint)
+
+    targets = []
+    for entry in entries:
+        path = "/" + entry.get("endpoint", "").lstrip("/")
+        params = entry.get("params", {})
+        endpoint = endpoints.get(path)
+        if endpoint is None or not hasattr(endpoint, "refresh"):
+            logger.error("Préchauffage : endpoint inconnu ou sans cache %s", path)
+            continue
+
+        expected = set(inspect.signature(endpoint).parameters)
+        if set(params) != expected:
+            logger.error(
+                "Préchauffage : paramètres de %s attendus %s, reçus %s",
+                path,
+                sorted(expected),
+                sorted(params),
+            )
+            continue
+
+        targets.append(
+            PrewarmTarget(
+                endpoint=path,
+                params=params,
+                interval=float(entry.get("interval", DEFAULT_INTERVAL)),
+                refresh=endpoint.refresh,
+                compute=endpoint.__wrapped__,
+            )
+        )
+    return targets
+
+
+class PrewarmScheduler:
+    """
+    Recalcule périodiquement les cibles dans le cache, chacune dans sa propre tâche.
+    """
+
+    def __init__(self, targets: list, concurrency: int, jitter: float):
+        self.targets = targets
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self._tasks: list[asyncio.Task] = []
+
+    def _jittered(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _refresh(self, target: PrewarmTarget) -> None:
+        params = {
+            name: resolve_relative_time(value, end=name in END_PARAMS)
+            for name, value in target.params.items()
+        }
+        started = time.perf_counter()
+        try:
+            if all(_is_aligned(value) for value in target.params.values()):
+                key = await target.refresh(**params)
+            else:
+                # Réponse qu'aucune requête ne lira : seules les données sont rafraîchies
+                await target.compute(**params)
+                key = None
+            # Avec des dates arrondies, la clé change chaque jour : l'ancienne entrée ne
+            # sert plus
+            if target.key is not None and target.key != key:
+                response_cache.discard(target.key)
+            target.key = key
+            target.last_error = None
+        except Exception as e:
+            # HTTPException des endpoints : le détail est plus parlant que str(e)
+            target.failures += 1
+            target.last_error = str(getattr(e, "detail", e))
+            logger.warning(
+                "Préchauffage de %s échoué : %s", target.endpoint, target.last_error
+            )
+        target.runs += 1
+        target.last_duration = time.perf_counter() - started
+        target.last_run = datetime.now(timezone.utc).isoformat()
+
+    async def _run(self, target: PrewarmTarget) -> None:
+        # Premiers recalculs étalés : les cibles ne partent pas toutes au démarrage
+        await asyncio.sleep(random.uniform(0, target.interval * self.jitter))
+        while True:
+            async with self._semaphore:
+                await self._refresh(target)
+            await asyncio.sleep(self._jittered(target.interval))
+
+    def start(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._run(t)) for t in self.targets]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_scheduler: PrewarmScheduler | None = None
+
+
+def start_prewarm(routes: list) -> None:
+    """
+    Démarre le préchauffage des cibles configurées (appelé au démarrage de l'application).
+
+    :param routes: Routes de l'application FastAPI.
+    """
+    global _scheduler
+    targets = load_targets(routes)
+    if not targets:
+        return
+    _scheduler = PrewarmScheduler(targets, PREWARM_CONCURRENCY, PREWARM_JITTER)
+    _scheduler.start()
+    logger.info("Préchauffage du cache : %d cibles", len(targets))
+
+
+async def stop_prewarm() -> None:
+    """
+    Arrête le préchauffage (appelé à l'arrêt de l'application).
+    """
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.stop()
+    _scheduler = None
+
+
+def get_stats() -> dict:
+    """
+    Retourne l'état des cibles de préchauffage (recalculs, échecs, dernière durée).
+    """
+    targets = _scheduler.targets if _scheduler is not None else []
+    return {
+        "targets": [
+            {
+                "endpoint": t.endpoint,
+                "params": t.params,
+                "interval": t.interval,
+                "runs": t.runs,
+                "failures": t.failures,
+                "last_run": t.last_run,
+                "last_duration": t.last_duration,
+                "last_error": t.last_error,
+            }
+            for t in targets
+        ]
+    }
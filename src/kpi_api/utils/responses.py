@@ -0,0 +1,62 @@
+"""
+Sérialisation JSON rapide des réponses de l'API.
+
+Les endpoints renvoient des structures simples (dictionnaires, listes, nombres, chaînes) :
+elles sont encodées directement en octets avec ``orjson`` (dépendance du projet ; le
+module ``json`` standard sert de repli s'il manque), sans passer par
+``jsonable_encoder``. Les types que l'encodeur ne connaît pas (dates du calendrier,
+objets pydantic...) sont confiés à ``jsonable_encoder``, pour garder exactement la même
+représentation qu'avant.
+"""
+
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from kpi_api.utils import timing
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """
+    Encode ``content`` en JSON compact (UTF-8).
+    """
+    with timing.span("serialize"):
+        if orjson is not None:
+            return orjson.dumps(
+                content,
+                default=jsonable_encoder,
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_SERIALIZE_NUMPY,
+            )
+        return json.dumps(
+            content,
+            default=jsonable_encoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Réponse JSON encodée avec ``dumps`` (classe de réponse par défaut de l'application).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RenderedJSONResponse(JSONResponse):
+    """
+    Réponse JSON dont le corps est déjà encodé (par exemple lu depuis le cache).
+    """
+
+    def render(self, content: bytes) -> bytes:
+        return content
@@ -0,0 +1,126 @@
+"""
+Calcul vectorisé (NumPy) des séries journalières des graphiques burndown/burnup.
+
+Les dates de création et de fermeture des issues sont représentées en jours
+``datetime64[D]``, converties en décalages par rapport au premier jour de la période,
+comptées par jour avec ``np.bincount`` puis cumulées avec ``np.cumsum``, sans parcourir
+la période jour par jour en Python.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def day_window(start: str, end: str) -> tuple:
+    """
+    Jours de la période [start, end], de jour en jour à partir de ``start``.
+
+    :param start: Date ISO de début.
+    :param end: Date ISO de fin.
+    :return: Le premier jour (``datetime64[D]``) et le nombre de jours de la période.
+    """
+    start_dt = datetime.fromisoformat(start)
+    end_dt = datetime.fromisoformat(end)
+    days = (end_dt - start_dt) // timedelta(days=1) + 1 if end_dt >= start_dt else 0
+    return np.datetime64(start_dt.date(), "D"), days
+
+
+def count_by_day(days: np.ndarray, origin: np.datetime64, length: int) -> np.ndarray:
+    """
+    Compte les jours ``days`` dans les ``length`` cases à partir de ``origin`` ; les jours
+    hors de la période et les NaT sont ignorés.
+    """
+    days = days[~np.isnat(days)]
+    offsets = (days - origin).astype(np.int64)
+    offsets = offsets[(offsets >= 0) & (offsets < length)]
+    return np.bincount(offsets, minlength=length)
+
+
+def day_labels(origin: np.datetime64, length: int) -> list:
+    """
+    Libellés YYYY-MM-DD des ``length`` jours à partir de ``origin``.
+    """
+    return np.arange(origin, origin + length).astype(str).tolist()
+
+
+def burndown_rows(
+    origin: np.datetime64, opened_by_day: np.ndarray, closed_by_day: np.ndarray
+) -> list:
+    """
+    Série du burndown chart : issues restantes, ligne idéale et issues fermées par jour.
+
+    :param origin: Premier jour de la période.
+    :param opened_by_day: Nombre d'issues créées par jour de la période.
+    :param closed_by_day: Nombre d'issues fermées par jour de la période.
+    :return: Liste de {"day", "remaining", "ideal", "done"}.
+    """
+    length = len(opened_by_day)
+    if length == 0:
+        return []
+
+    remaining = np.cumsum(opened_by_day - closed_by_day)
+
+    # Ligne idéale de burndown (commence à remaining[0], linéaire et atteint 0 à la fin)
+    step = remaining[0] / (length - 1) if length > 1 else 0
+    ideal = remaining[0] - np.arange(length) * step
+
+    return [
+        {"day": day, "remaining": r, "ideal": i, "done": d}
+        for day, r, i, d in zip(
+            day_labels(origin, length),
+            remaining.tolist(),
+            ideal.tolist(),
+            closed_by_day.tolist(),
+        )
+    ]
+
+
+def burnup_rows(
+    origin: np.datetime64, opened_by_day: np.ndarray, closed_by_day: np.ndarray
+) -> list:
+    """
+    Série du burnup chart : nombre cumulé d'issues créées et fermées par jour.
+
+    :param origin: Premier jour de la période.
+    :param opened_by_day: Nombre d'issues créées par jour de la période.
+    :param closed_by_day: Nombre d'issues fermées par jour de la période.
+    :return: Liste de {"day", "total_issues", "issues_closed"}.
+    """
+    total = np.cumsum(opened_by_day)
+    done = np.cumsum(closed_by_day)
+    return [
+        {"day": day, "total_issues": t, "issues_closed": c}
+        for day, t, c in zip(
+            day_labels(origin, len(total)), total.tolist(), done.tolist()
+        )
+    ]
+
+
+def opened_closed_rows(created_days: np.ndarray, closed_days: np.ndarray) -> list:
+    """
+    Nombre d'issues ouvertes et fermées pour chaque jour où au moins une issue a été créée.
+
+    :param created_days: Jours de création des issues.
+    :param closed_days: Jours de fermeture des issues (NaT si ouvertes).
+    :return: Liste de {"day", "opened", "closed"}, par jour croissant.
+    """
+    created_days = created_days[~np.isnat(created_days)]
+    if created_days.size == 0:
+        return []
+    closed_days = closed_days[~np.isnat(closed_days)]
+
+    origin = created_days.min()
+    last = max(created_days.max(), closed_days.max() if closed_days.size else origin)
+    length = int((last - origin).astype(np.int64)) + 1
+
+    opened_by_day = count_by_day(created_days, origin, length)
+    closed_by_day = count_by_day(closed_days, origin, length)
+    (offsets,) = np.nonzero(opened_by_day)
+    labels = (origin + offsets).astype(str).tolist()
+    return [
+        {"day": day, "opened": o, "closed": c}
+        for day, o, c in zip(
+            labels, opened_by_day[offsets].tolist(), closed_by_day[offsets].tolist()
+        )
+    ]
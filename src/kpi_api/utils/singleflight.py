@@ -0,0 +1,77 @@
+"""
+Regroupement des appels identiques en cours (single-flight).
+
+Grafana envoie souvent plusieurs fois la même requête pour un même dashboard, et plusieurs
+personnes peuvent regarder le même dashboard. Tant qu'un appel à une fonction de récupération
+est en cours, les appels suivants avec les mêmes arguments attendent son résultat au lieu de
+relancer la pagination auprès de GitLab, Kimai ou CalDAV.
+"""
+
+import asyncio
+import functools
+import inspect
+from collections import defaultdict
+
+from kpi_api.utils import metrics
+
+# clé -> tâche en cours
+_in_flight: dict[tuple, asyncio.Task] = {}
+
+# nom de la fonction -> {"issued": appels réellement lancés, "coalesced": appels regroupés}
+_stats: dict[str, dict[str, int]] = defaultdict(lambda: {"issued": 0, "coalesced": 0})
+
+
+def _function_name(func) -> str:
+    func = inspect.unwrap(func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+async def coalesced(func, *args, **kwargs):
+    """
+    Appelle ``func(*args, **kwargs)`` en partageant le résultat avec les appels identiques
+    déjà en cours. Les fonctions synchrones sont exécutées dans un thread pour ne pas bloquer
+    la boucle d'événements.
+
+    :param func: Fonction de récupération (synchrone ou coroutine).
+    :return: Le résultat de la fonction.
+    """
+    name = _function_name(func)
+    key = (name, args, tuple(sorted(kwargs.items())))
+
+    task = _in_flight.get(key)
+    if task is not None:
+        _stats[name]["coalesced"] += 1
+    else:
+        _stats[name]["issued"] += 1
+        if inspect.iscoroutinefunction(func):
+            coroutine = func(*args, **kwargs)
+        else:
+            coroutine = asyncio.to_thread(functools.partial(func, *args, **kwargs))
+        task = asyncio.ensure_future(coroutine)
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    # shield : l'annulation d'un appelant (client déconnecté) n'annule pas les autres
+    return await asyncio.shield(task)
+
+
+def get_stats() -> dict:
+    """
+    Retourne les compteurs d'appels lancés et regroupés, globaux et par fonction.
+    """
+    return {
+        "issued": sum(s["issued"] for s in _stats.values()),
+        "coalesced": sum(s["coalesced"] for s in _stats.values()),
+        "in_flight": len(_in_flight),
+        "by_function": {name: dict(s) for name, s in _stats.items()},
+    }
+
+
+def _collect_metrics() -> None:
+    for name, stats in _stats.items():
+        for kind, count in stats.items():
+            metrics.SINGLEFLIGHT_CALLS.set(count, function=name, kind=kind)
+    metrics.SINGLEFLIGHT_IN_FLIGHT.set(len(_in_flight))
+
+
+metrics.on_collect(_collect_metrics)
@@ -0,0 +1,205 @@
+"""
+Feuilles de temps Kimai agrégées en un cube utilisateur × activité × jour.
+
+Les routes Kimai (heures par utilisateur, répartition par activité, semaine courante et
+précédente) lisent toutes les mêmes feuilles de temps ``/api/timesheets?user=all`` et n'en
+gardent qu'une somme. Chaque fenêtre est lue une seule fois auprès de Kimai et agrégée en
+une passe dans un cube de secondes, gardé ``KIMAI_SNAPSHOT_TTL`` secondes : chaque route
+calcule sa réponse à partir du cube, et les appels concurrents pour la même fenêtre
+attendent la même lecture.
+
+Les fenêtres alignées sur des jours entiers (00:00:00 → 23:59:59) peuvent aussi être
+servies par un cube existant qui les couvre, par exemple la semaine courante par le cube
+des deux dernières semaines.
+
+Les jours entiers déjà clos de la fenêtre sont lus dans l'historique local
+(``kpi_api.utils.kimai_history``) : seuls les jours incomplets aux bords de la fenêtre et
+la période ouverte sont demandés à Kimai.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from kpi_api.utils.config import (
+    KIMAI_PAGE_SIZE,
+    KIMAI_SNAPSHOT_MAX_ENTRIES,
+    KIMAI_SNAPSHOT_TTL,
+)
+from kpi_api.utils.kimai_client import kimai_get_all_pages
+from kpi_api.utils.kimai_history import day_rows, history
+from kpi_api.utils.singleflight import coalesced
+
+logger = logging.getLogger(__name__)
+
+START_OF_DAY = "00:00:00"
+END_OF_DAY = "23:59:59"
+
+
+def _day(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def _time(value: str) -> str:
+    return value[11:19] or START_OF_DAY
+
+
+def _is_whole_days(begin: str, end: str) -> bool:
+    return _time(begin) == START_OF_DAY and _time(end) == END_OF_DAY
+
+
+def _closed_days(begin: str, end: str, today: date) -> tuple | None:
+    """
+    Premier et dernier jour entièrement compris dans [begin, end] et antérieurs à
+    ``today`` (jour courant dans le fuseau de Kimai), ou None s'il n'y en a pas.
+    """
+    first = _day(begin)
+    if _time(begin) != START_OF_DAY:
+        first += timedelta(days=1)
+    last = _day(end)
+    if _time(end) != END_OF_DAY:
+        last -= timedelta(days=1)
+    last = min(last, today - timedelta(days=1))
+    return (first, last) if first <= last else None
+
+
+class TimesheetCube:
+    """
+    Secondes travaillées par utilisateur, activité et jour sur une fenêtre.
+
+    ``seconds[u, a, d]`` : durée des feuilles de temps de l'utilisateur ``user_ids[u]``
+    sur l'activité ``activity_ids[a]`` commencées le jour ``first_day + d``.
+    """
+
+    def __init__(self, begin: str, end: str, rows: list):
+        """
+        :param begin: Début de la fenêtre.
+        :param end: Fin de la fenêtre.
+        :param rows: Totaux (user_id, activity_id, jour, secondes), voir ``day_rows``.
+        """
+        self.begin = begin
+        self.end = end
+        self.whole_days = _is_whole_days(begin, end)
+        self.first_day = _day(begin)
+        self.last_day = _day(end)
+        self.built_at = time.monotonic()
+
+        users = [row[0] for row in rows]
+        activities = [row[1] for row in rows]
+        days = [(row[2] - self.first_day).days for row in rows]
+
+        self.user_ids = sorted(set(users))
+        self.activity_ids = sorted({aid for aid in activities if aid is not None})
+        user_index = {uid: i for i, uid in enumerate(self.user_ids)}
+        activity_index = {aid: i for i, aid in enumerate(self.activity_ids)}
+
+        n_days = (self.last_day - self.first_day).days + 1
+        # Une colonne d'activité de plus pour les feuilles sans activité
+        self.seconds = np.zeros(
+            (len(self.user_ids), len(self.activity_ids) + 1, n_days), dtype=np.int64
+        )
+        u = np.array([user_index[uid] for uid in users], dtype=np.int64)
+        a = np.array(
+            [activity_index.get(aid, len(self.activity_ids)) for aid in activities],
+            dtype=np.int64,
+        )
+        d = np.array(days, dtype=np.int64)
+        durations = np.array([row[3] for row in rows], dtype=np.int64)
+        keep = (d >= 0) & (d < n_days)
+        np.add.at(self.seconds, (u[keep], a[keep], d[keep]), durations[keep])
+
+    def covers(self, begin: str, end: str) -> bool:
+        """
+        Vrai si le cube peut répondre exactement pour la fenêtre [begin, end].
+        """
+        if (begin, end) == (self.begin, self.end):
+            return True
+        return (
+            self.whole_days
+            and _is_whole_days(begin, end)
+            and self.first_day <= _day(begin)
+            and _day(end) <= self.last_day
+        )
+
+    def _days(self, begin: str | None, end: str | None) -> slice:
+        start = (_day(begin) - self.first_day).days if begin else 0
+        stop = (_day(end) - self.first_day).days + 1 if end else None
+        return slice(max(start, 0), stop)
+
+    def seconds_by_user(self, begin: str | None = None, end: str | None = None) -> dict:
+        """
+        Secondes travaillées par utilisateur (id -> secondes) entre deux dates incluses.
+        """
+        totals = self.seconds[:, :, self._days(begin, end)].sum(axis=(1, 2))
+        return dict(zip(self.user_ids, totals.tolist()))
+
+    def seconds_by_user_activity(
+        self, begin: str | None = None, end: str | None = None
+    ) -> dict:
+        """
+        Secondes travaillées par utilisateur et activité (id -> id d'activité -> secondes)
+        entre deux dates incluses ; les feuilles sans activité ne sont pas comptées.
+        """
+        totals = self.seconds[:, :-1, self._days(begin, end)].sum(axis=2)
+        return {
+            uid: dict(zip(self.activity_ids, row))
+            for uid, row in zip(self.user_ids, totals.tolist())
+        }
+
+
+# Cubes récents, du plus ancien au plus récent
+_cubes: list[TimesheetCube] = []
+
+
+async def _fetch_rows(begin: str, end: str) -> list:
+    params = {"begin": begin, "end": end, "user": "all"}
+    entries = await kimai_get_all_pages("/api/timesheets", params, KIMAI_PAGE_SIZE)
+    logger.debug("%d feuilles de temps du %s au %s", len(entries), begin, end)
+    return day_rows(entries)
+
+
+async def _build_cube(begin: str, end: str) -> TimesheetCube:
+    closed = None
+    if history is not None:
+        # Même horloge que l'historique : le jour encore ouvert dans Kimai n'est pas clos
+        closed = _closed_days(begin, end, await history.today())
+    if closed is None:
+        rows = await _fetch_rows(begin, end)
+    else:
+        # Jours clos depuis l'historique local, bords incomplets et période ouverte
+        # depuis Kimai
+        first, last = closed
+        windows = []
+        if begin < f"{first}T{START_OF_DAY}":
+            windows.append((begin, f"{first - timedelta(days=1)}T{END_OF_DAY}"))
+        if f"{last}T{END_OF_DAY}" < end:
+            windows.append((f"{last + timedelta(days=1)}T{START_OF_DAY}", end))
+        parts = await asyncio.gather(
+            history.rows(first, last), *(_fetch_rows(b, e) for b, e in windows)
+        )
+        rows = [row for part in parts for row in part]
+    cube = TimesheetCube(begin, end, rows)
+    _cubes.append(cube)
+    del _cubes[:-KIMAI_SNAPSHOT_MAX_ENTRIES]
+    return cube
+
+
+async def get_timesheet_cube(begin: str, end: str) -> TimesheetCube:
+    """
+    Retourne le cube des feuilles de temps de tous les utilisateurs sur la fenêtre, lu
+    auprès de Kimai seulement si aucun cube récent ne la couvre.
+
+    :param begin: Début de la fenêtre, date locale ISO sans fuseau ("2025-01-01T00:00:00").
+    :param end: Fin de la fenêtre, au même format.
+    :return: Le cube (en lecture seule).
+    """
+    begin, end = (f"{v}T{START_OF_DAY}" if len(v) == 10 else v for v in (begin, end))
+    now = time.monotonic()
+    _cubes[:] = [c for c in _cubes if now - c.built_at < KIMAI_SNAPSHOT_TTL]
+    for cube in reversed(_cubes):
+        if cube.covers(begin, end):
+            return cube
+    return await coalesced(_build_cube, begin, end)
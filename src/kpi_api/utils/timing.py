@@ -0,0 +1,121 @@
+"""
+Décomposition du temps de chaque requête dans l'en-tête ``Server-Timing``.
+
+Quand un panneau Grafana est lent, les outils de développement du navigateur affichent
+directement cet en-tête : temps passé à attendre les services externes (``upstream``),
+nombre de pages lues (``pages``), sérialisation JSON (``serialize``), compression
+(``compress``), le reste étant du calcul Python (``compute``), et l'état du cache.
+
+Les mesures sont rangées dans un objet propre à la requête, porté par une ``ContextVar`` :
+les tâches et les threads lancés pendant la requête (pagination parallèle, fonctions
+Kimai/CalDAV exécutées dans un thread) copient le contexte et alimentent donc le même
+objet. En dehors d'une requête (préchauffage, scripts), les mesures sont ignorées.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations: dict[str, float] = defaultdict(float)
+        self.pages = 0
+        self.cache: str | None = None
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def add(name: str, seconds: float) -> None:
+    """
+    Ajoute une durée (secondes) au poste ``name`` de la requête en cours.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.durations[name] += seconds
+
+
+def add_pages(count: int = 1) -> None:
+    """
+    Compte des pages lues auprès d'un service externe pour la requête en cours.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.pages += count
+
+
+def set_cache(result: str) -> None:
+    """
+    Note le résultat de la lecture du cache des réponses ("hit", "stale", "miss").
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.cache = result
+
+
+@contextmanager
+def span(name: str):
+    """
+    Mesure le bloc et ajoute sa durée au poste ``name`` de la requête en cours.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - started)
+
+
+def _header(timings: RequestTimings, total: float) -> bytes:
+    durations = timings.durations
+    measured = sum(durations.values())
+    parts = [
+        f"upstream;dur={durations.get('upstream', 0.0) * 1000:.1f}",
+        f'pages;desc="{timings.pages}"',
+        f"compute;dur={max(total - measured, 0.0) * 1000:.1f}",
+        f"serialize;dur={durations.get('serialize', 0.0) * 1000:.1f}",
+    ]
+    if "compress" in durations:
+        parts.append(f"compress;dur={durations['compress'] * 1000:.1f}")
+    if timings.cache is not None:
+        parts.append(f'cache;desc="{timings.cache}"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI ajoutant l'en-tête ``Server-Timing`` à chaque réponse HTTP.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = _header(timings, time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header),
+                    ],
+                }
+            await send(message)
+
+        token = _current.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)